@@ -0,0 +1,80 @@
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from corpus import generate_markdown
+from htmlnode import LeafNode, ParentNode
+from markdown_blocks import markdown_to_html_node
+
+
+class DictNode:
+    # Same fields as HTMLNode without __slots__, i.e. the dict-backed layout.
+    def __init__(self, tag, value, children, props):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+
+def count_nodes(root):
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if isinstance(node, ParentNode):
+            stack.extend(node.children)
+    return count
+
+
+def to_dict_nodes(node):
+    if isinstance(node, ParentNode):
+        children = [to_dict_nodes(child) for child in node.children]
+        return DictNode(node.tag, None, children, node.props)
+    return DictNode(node.tag, node.value, None, node.props)
+
+
+def to_slotted_nodes(node):
+    if isinstance(node, ParentNode):
+        children = [to_slotted_nodes(child) for child in node.children]
+        return ParentNode(node.tag, children, node.props)
+    return LeafNode(node.tag, node.value, node.props)
+
+
+def measure(build):
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure memory per HTML node.")
+    parser.add_argument("--size", type=int, default=10 * 1024 * 1024,
+                        help="corpus size in bytes (default 10 MB)")
+    parser.add_argument("--mix", default="mixed")
+    args = parser.parse_args()
+
+    markdown = generate_markdown(args.size, args.mix)
+    sys.setrecursionlimit(10000)
+
+    # Copy the parsed tree into each layout so both measurements share the
+    # same strings and props and only the node objects differ.
+    root = markdown_to_html_node(markdown)
+    nodes = count_nodes(root)
+    _, slotted = measure(lambda: to_slotted_nodes(root))
+    _, dict_backed = measure(lambda: to_dict_nodes(root))
+
+    print(f"corpus:            {len(markdown) / 1e6:.1f} MB ({args.mix})")
+    print(f"nodes:             {nodes}")
+    print(f"slotted:           {slotted / nodes:.1f} bytes/node")
+    print(f"dict-backed:       {dict_backed / nodes:.1f} bytes/node")
+    print(f"saved:             {(dict_backed - slotted) / nodes:.1f} bytes/node")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from corpus import MIXES, generate_markdown
+from inline_markdown import text_to_textnodes
+from markdown_blocks import (
+    block_to_block_type,
+    markdown_to_blocks,
+    markdown_to_html_node,
+)
+from template import Template
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+STAGES = ("blocks", "block_type", "inline", "to_html", "template", "write")
+
+
+def inline_texts(blocks):
+    texts = []
+    for block in blocks:
+        if block.startswith("```"):
+            continue
+        texts.extend(block.split("\n"))
+    return texts
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def run_case(mix, size, repeat, template, out_dir):
+    markdown = generate_markdown(size, mix)
+    timings = {}
+
+    timings["blocks"], blocks = best_of(repeat, lambda: markdown_to_blocks(markdown))
+    timings["block_type"], _ = best_of(
+        repeat, lambda: [block_to_block_type(block) for block in blocks]
+    )
+    texts = inline_texts(blocks)
+    timings["inline"], _ = best_of(
+        repeat, lambda: [text_to_textnodes(text) for text in texts]
+    )
+    node = markdown_to_html_node(markdown)
+    timings["to_html"], html = best_of(repeat, node.to_html)
+    timings["template"], page = best_of(
+        repeat, lambda: template.render(Title="Benchmark", Content=html)
+    )
+    dest_path = os.path.join(out_dir, f"{mix}-{size}.html")
+
+    def write():
+        with open(dest_path, "w") as out:
+            out.write(page)
+
+    timings["write"], _ = best_of(repeat, write)
+
+    total = sum(timings.values())
+    return {
+        "mix": mix,
+        "size": len(markdown),
+        "seconds": timings,
+        "total": total,
+        "mb_per_s": len(markdown) / total / 1e6,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline_path, results):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(case["mix"], case["size"]): case for case in baseline["cases"]}
+    print(f"\ncompared with {baseline.get('revision')} ({baseline_path}):")
+    for case in results["cases"]:
+        old = previous.get((case["mix"], case["size"]))
+        if old is None:
+            continue
+        changes = []
+        for stage in STAGES + ("total",):
+            before = old["seconds"][stage] if stage != "total" else old["total"]
+            after = case["seconds"][stage] if stage != "total" else case["total"]
+            changes.append(f"{stage} {(after - before) / before * 100:+.0f}%")
+        print(f"  {case['mix']:>7} {case['size']:>9}  " + "  ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each stage of the markdown to HTML pipeline.")
+    parser.add_argument("--sizes", default="100000,1000000",
+                        help="comma-separated corpus sizes in bytes")
+    parser.add_argument("--mixes", default=",".join(MIXES),
+                        help="comma-separated feature mixes")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="JSON results from an earlier run")
+    args = parser.parse_args()
+
+    template = Template(os.path.join(ROOT, "template.html"))
+    results = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "cases": [],
+    }
+    print(f"{'mix':>7} {'bytes':>9}  " + "  ".join(f"{s:>10}" for s in STAGES) + "    MB/s")
+    with tempfile.TemporaryDirectory() as out_dir:
+        for size in [int(size) for size in args.sizes.split(",")]:
+            for mix in args.mixes.split(","):
+                case = run_case(mix, size, args.repeat, template, out_dir)
+                results["cases"].append(case)
+                print(f"{mix:>7} {case['size']:>9}  "
+                      + "  ".join(f"{case['seconds'][s] * 1000:>8.1f}ms" for s in STAGES)
+                      + f"  {case['mb_per_s']:6.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1)
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import random
+
+WORDS = (
+    "the ring was forged in the fires of mount doom by sauron lord of "
+    "mordor and elves of rivendell kept watch over middle earth while "
+    "hobbits of the shire lived quiet lives far from the shadow"
+).split()
+
+# Relative weight of each block kind per feature mix.
+MIXES = {
+    "prose":   {"paragraph": 8, "heading": 1, "ulist": 1},
+    "inline":  {"inline": 8, "heading": 1, "ulist": 1},
+    "lists":   {"ulist": 5, "olist": 4, "heading": 1},
+    "links":   {"links": 8, "heading": 1, "ulist": 1},
+    "code":    {"code": 6, "paragraph": 3, "heading": 1},
+    "mixed":   {"paragraph": 3, "inline": 3, "ulist": 2, "olist": 1,
+                "links": 2, "code": 1, "quote": 1, "heading": 1},
+}
+
+
+def words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def inline_sentence(rng):
+    parts = []
+    for _ in range(6):
+        kind = rng.randrange(4)
+        text = words(rng, rng.randint(1, 3))
+        if kind == 0:
+            parts.append(f"**{text}**")
+        elif kind == 1:
+            parts.append(f"_{text}_")
+        elif kind == 2:
+            parts.append(f"`{text}`")
+        else:
+            parts.append(text)
+        parts.append(words(rng, rng.randint(2, 6)))
+    return " ".join(parts) + "."
+
+
+def link_sentence(rng):
+    parts = []
+    for i in range(4):
+        text = words(rng, rng.randint(1, 3))
+        slug = text.replace(" ", "-")
+        if i % 2:
+            parts.append(f"![{text}](/images/{slug}.png)")
+        else:
+            parts.append(f"[{text}](/blog/{slug})")
+        parts.append(words(rng, rng.randint(3, 8)))
+    return " ".join(parts)
+
+
+def block(rng, kind):
+    if kind == "paragraph":
+        return "\n".join(words(rng, rng.randint(10, 20)) for _ in range(4))
+    if kind == "inline":
+        return "\n".join(inline_sentence(rng) for _ in range(3))
+    if kind == "links":
+        return "\n".join(link_sentence(rng) for _ in range(3))
+    if kind == "heading":
+        return "#" * rng.randint(2, 4) + " " + words(rng, 4)
+    if kind == "ulist":
+        return "\n".join(f"- {inline_sentence(rng)}" for _ in range(rng.randint(5, 30)))
+    if kind == "olist":
+        return "\n".join(
+            f"{i}. {words(rng, rng.randint(4, 12))}" for i in range(1, rng.randint(5, 30))
+        )
+    if kind == "code":
+        body = "\n".join(
+            "    " * rng.randrange(3) + words(rng, rng.randint(2, 8))
+            for _ in range(rng.randint(10, 60))
+        )
+        return f"```\n{body}\n```"
+    if kind == "quote":
+        return "\n".join(f"> {words(rng, 12)}" for _ in range(3))
+    raise ValueError(f"unknown block kind: {kind}")
+
+
+def generate_markdown(size, mix="mixed", seed=0):
+    rng = random.Random(seed)
+    kinds = list(MIXES[mix])
+    weights = [MIXES[mix][kind] for kind in kinds]
+    blocks = [f"# {words(rng, 5)}"]
+    total = len(blocks[0])
+    while total < size:
+        text = block(rng, rng.choices(kinds, weights)[0])
+        blocks.append(text)
+        total += len(text) + 2
+    return "\n\n".join(blocks) + "\n"
@@ -0,0 +1,108 @@
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from fsutil import atomic_write
+from instrument import VERBOSE, log
+from manifest import hash_bytes, output_key
+
+# Text outputs a server can send with a Content-Encoding. Images and the
+# search index's .json.gz files are already compressed.
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".json", ".svg", ".xml", ".txt", ".map")
+ENCODING_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+MIN_SIZE = 1024
+
+
+def available_encodings():
+    if brotli is None:
+        return ["gzip"]
+    return ["gzip", "br"]
+
+
+def variant_paths(dest_path):
+    return [str(dest_path) + suffix for suffix in ENCODING_SUFFIXES.values()]
+
+
+def is_compressible(dest_path):
+    return os.path.splitext(str(dest_path))[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def compress(data, encoding):
+    # mtime=0 keeps the gzip header, and so the file, identical across builds.
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=11)
+
+
+def precompress(manifest, dest_paths, min_size=MIN_SIZE, workers=4):
+    # Variants are recorded against the hash and stamp of the output they
+    # were made from, so a rebuild that writes the same bytes compresses
+    # nothing, and an output left untouched is not even read again.
+    encodings = available_encodings()
+    candidates = []
+    for dest_path in dest_paths:
+        if not is_compressible(dest_path):
+            continue
+        try:
+            stat = os.stat(dest_path)
+        except FileNotFoundError:
+            continue
+        if stat.st_size < min_size:
+            continue
+        candidates.append((str(dest_path), [stat.st_mtime_ns, stat.st_size]))
+
+    def unchanged(dest_path, stamp):
+        # The output's manifest entry and file stamp match the previous
+        # build, and so do the stamps its existing variants were made from.
+        key = output_key(dest_path)
+        if manifest.outputs.get(key) != manifest.previous.get(key):
+            return None
+        variants = []
+        for encoding in encodings:
+            out_path = dest_path + ENCODING_SUFFIXES[encoding]
+            recorded = _recorded(manifest, out_path)
+            if (recorded is None or recorded.get("stamp") != stamp
+                    or not os.path.exists(out_path)):
+                return None
+            variants.append((out_path, recorded, False))
+        return variants
+
+    def run(candidate):
+        dest_path, stamp = candidate
+        variants = unchanged(dest_path, stamp)
+        if variants is not None:
+            return variants
+        with open(dest_path, "rb") as f:
+            data = f.read()
+        digest = hash_bytes(data)
+        variants = []
+        for encoding in encodings:
+            out_path = dest_path + ENCODING_SUFFIXES[encoding]
+            inputs = {"source": dest_path, "hash": digest, "encoding": encoding,
+                      "stamp": stamp}
+            # A touched output with the same bytes keeps its variants.
+            recorded = _recorded(manifest, out_path) or {}
+            written = dict(recorded, stamp=stamp) != inputs or not os.path.exists(out_path)
+            if written:
+                log(f" * {dest_path} -> {out_path}", VERBOSE)
+                atomic_write(out_path, compress(data, encoding))
+            variants.append((out_path, inputs, written))
+        return variants
+
+    written = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for variants in executor.map(run, candidates):
+            for out_path, inputs, was_written in variants:
+                manifest.record(out_path, inputs)
+                written += was_written
+    return written
+
+
+def _recorded(manifest, path):
+    key = output_key(path)
+    return manifest.outputs.get(key, manifest.previous.get(key))
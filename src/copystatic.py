@@ -1,16 +1,117 @@
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
-def copy_files_recursive(source_dir_path, dest_dir_path):
-    if not os.path.exists(dest_dir_path):
-        os.mkdir(dest_dir_path)
+from discover import STATIC_IGNORE, scan
+from fingerprint import fingerprint_static
+from fsutil import atomic_replace, write_if_changed
+from instrument import VERBOSE, log
+from manifest import hash_file
 
-    for filename in os.listdir(source_dir_path):
-        from_path = os.path.join(source_dir_path, filename)
-        dest_path = os.path.join(dest_dir_path, filename)
-        print(f" * {from_path} -> {dest_path}")
-        if os.path.isfile(from_path):
-            shutil.copy(from_path, dest_path)
+FICLONE = 0x40049409
+
+
+def sync_static(source_dir_path,
+                dest_dir_path,
+                manifest=None,
+                compare="mtime",
+                link="copy",
+                workers=4,
+                report=None,
+                assets=None):
+    # With an asset manifest, fingerprinted files are placed under names
+    # that change with their content, so an existing one is up to date.
+    entries = scan(source_dir_path, STATIC_IGNORE)
+    planned = fingerprint_static(entries, manifest, assets) if assets is not None else {}
+    jobs = []
+    for entry in entries:
+        if entry.path in planned:
+            rel_path, inputs, data = planned[entry.path]
+            dest_path = os.path.normpath(os.path.join(dest_dir_path, rel_path))
+            if not os.path.exists(dest_path):
+                jobs.append((entry, dest_path, data))
+        else:
+            dest_path = static_dest_path(entry, dest_dir_path)
+            inputs = static_inputs(manifest, entry.path, compare)
+            if not is_unchanged(entry, dest_path, compare, manifest, inputs):
+                jobs.append((entry, dest_path, None))
+        if manifest is not None:
+            manifest.record(dest_path, inputs)
+
+    os.makedirs(dest_dir_path, exist_ok=True)
+    for dir_path in sorted({os.path.dirname(dest_path) for _, dest_path, _ in jobs}):
+        os.makedirs(dir_path, exist_ok=True)
+
+    def copy(job):
+        entry, dest_path, data = job
+        log(f" * {entry.path} -> {dest_path}", VERBOSE)
+        if data is not None:
+            write_if_changed(dest_path, data)
         else:
-            copy_files_recursive(from_path, dest_path)
+            copy_file(entry.path, dest_path, link)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        list(executor.map(copy, jobs))
+    if report is not None:
+        for entry, _, _ in jobs:
+            report.add_static(entry.size)
+    return len(jobs)
+
+
+def collect_files(source_dir_path, dest_dir_path, assets=None):
+    return [(entry.path, static_dest_path(entry, dest_dir_path, assets))
+            for entry in scan(source_dir_path, STATIC_IGNORE)]
+
+
+def static_dest_path(entry, dest_dir_path, assets=None):
+    dest_path = os.path.normpath(os.path.join(dest_dir_path, entry.rel_path))
+    if assets is not None:
+        return assets.output_path(dest_path, dest_dir_path)
+    return dest_path
+
+
+def static_inputs(manifest, from_path, compare):
+    if compare == "hash":
+        digest = manifest.hash(from_path) if manifest is not None else hash_file(from_path)
+        return {"source": from_path, "hash": digest}
+    return {"source": from_path}
+
+
+def is_unchanged(entry, dest_path, compare, manifest, inputs):
+    if compare == "hash":
+        if manifest is not None:
+            return manifest.is_current(dest_path, inputs)
+        return os.path.exists(dest_path) and hash_file(dest_path) == inputs["hash"]
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False
+    return entry.size == dest_stat.st_size and entry.mtime_ns == dest_stat.st_mtime_ns
+
+
+def copy_file(from_path, dest_path, link="copy"):
+    # Files are placed under a temporary name and renamed over the old
+    # output, so an existing destination (possibly a hardlink to the
+    # source) is never written through or seen half-copied.
+    with atomic_replace(dest_path) as tmp_path:
+        if link == "hardlink":
+            try:
+                os.link(from_path, tmp_path)
+                return
+            except OSError:
+                pass
+        elif link == "reflink" and fcntl is not None:
+            try:
+                with open(from_path, "rb") as src, open(tmp_path, "wb") as dst:
+                    fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                shutil.copystat(from_path, tmp_path)
+                return
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        shutil.copy2(from_path, tmp_path)
@@ -0,0 +1,76 @@
+import os
+
+from inline_markdown import extract_markdown_images, extract_markdown_links
+from manifest import output_key
+
+# Dependency kinds that change a page's output. "links" is recorded for
+# lookups only: a linked page changing does not change the linking page.
+INVALIDATING_KINDS = ("source", "template", "assets", "pages")
+
+
+def extract_dependencies(markdown, dest_dir_path):
+    assets = set()
+    links = set()
+    for _, url in extract_markdown_images(markdown):
+        path = local_output_path(url, dest_dir_path)
+        if path is not None:
+            assets.add(path)
+    for _, url in extract_markdown_links(markdown):
+        path = local_output_path(url, dest_dir_path)
+        if path is not None:
+            links.add(path)
+    return sorted(assets), sorted(links)
+
+
+def local_output_path(url, dest_dir_path):
+    url = url.split("#", 1)[0].split("?", 1)[0]
+    if not url.startswith("/") or url.startswith("//"):
+        return None
+    path = os.path.join(dest_dir_path, url.lstrip("/"))
+    if not os.path.splitext(path)[1]:
+        path = os.path.join(path, "index.html")
+    return output_key(path)
+
+
+def stamp(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class DependencyGraph:
+    def __init__(self):
+        self.dependents = {}
+
+    @classmethod
+    def from_outputs(cls, outputs):
+        graph = cls()
+        for output, entry in outputs.items():
+            graph.add(entry["source"], output, "source")
+            for kind, paths in entry.get("deps", {}).items():
+                for path in paths:
+                    graph.add(path, output, kind)
+        return graph
+
+    def add(self, input_path, output_path, kind):
+        dependents = self.dependents.setdefault(output_key(input_path), {})
+        dependents[output_key(output_path)] = kind
+
+    def dependents_of(self, input_path, kinds=INVALIDATING_KINDS):
+        dependents = self.dependents.get(output_key(input_path), {})
+        return sorted(output for output, kind in dependents.items() if kind in kinds)
+
+    def affected(self, changed_paths, kinds=INVALIDATING_KINDS):
+        # Outputs can be inputs of other outputs (a page's image is a copied
+        # static output), so follow edges until nothing new is reached.
+        affected = set()
+        pending = [output_key(path) for path in changed_paths]
+        while pending:
+            path = pending.pop()
+            for output in self.dependents_of(path, kinds):
+                if output not in affected:
+                    affected.add(output)
+                    pending.append(output)
+        return affected
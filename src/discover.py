@@ -0,0 +1,72 @@
+import fnmatch
+import os
+import re
+
+# Editor swap and backup files.
+EDITOR_PATTERNS = ("*~", "*.swp", "*.swo", "*.swx", "#*#", "4913")
+# Dotfiles (.gitkeep, .DS_Store, .git/) and editor files.
+IGNORE_PATTERNS = (".*",) + EDITOR_PATTERNS
+# Drafts are kept out of the site but left in place next to published pages.
+DRAFT_PATTERNS = ("_*", "*.draft.md")
+CONTENT_IGNORE = IGNORE_PATTERNS + DRAFT_PATTERNS
+# Some dotfiles are published on purpose (.well-known/, .nojekyll), so
+# static files only skip version control and desktop clutter.
+STATIC_IGNORE = EDITOR_PATTERNS + (".git", ".hg", ".svn", ".gitkeep", ".gitignore",
+                                   ".DS_Store")
+
+
+class FileEntry:
+    __slots__ = ("path", "rel_path", "size", "mtime_ns")
+
+    def __init__(self, path, rel_path, size, mtime_ns):
+        self.path = path
+        self.rel_path = rel_path
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def __repr__(self):
+        return f"FileEntry({self.rel_path}, {self.size}, {self.mtime_ns})"
+
+
+def ignore_matcher(patterns):
+    # Patterns with a slash match the path below the root, the rest match
+    # the file or directory name alone.
+    name_patterns = [fnmatch.translate(p) for p in patterns if "/" not in p]
+    path_patterns = [fnmatch.translate(p) for p in patterns if "/" in p]
+    name_match = re.compile("|".join(name_patterns)).match if name_patterns else None
+    path_match = re.compile("|".join(path_patterns)).match if path_patterns else None
+
+    def is_ignored(name, rel_path):
+        return bool((name_match and name_match(name))
+                    or (path_match and path_match(rel_path)))
+    return is_ignored
+
+
+def scan(root, ignore=IGNORE_PATTERNS, suffix="", skipped=None):
+    # One os.scandir pass per directory: the entry type comes from the
+    # directory listing, and the only stat is the one kept as metadata.
+    # When skipped is given, the ignored directories and files with the
+    # suffix are added to it.
+    if not os.path.isdir(root):
+        return []
+    is_ignored = ignore_matcher(ignore)
+    files = []
+    pending = [(root, "")]
+    while pending:
+        dir_path, rel_dir = pending.pop()
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                name = entry.name
+                rel_path = rel_dir + name
+                if is_ignored(name, rel_path):
+                    if skipped is not None and (name.endswith(suffix) or entry.is_dir()):
+                        skipped.append(rel_path)
+                    continue
+                if entry.is_dir():
+                    pending.append((entry.path, rel_path + os.sep))
+                elif name.endswith(suffix) and entry.is_file():
+                    stat = entry.stat()
+                    files.append(FileEntry(entry.path, rel_path,
+                                           stat.st_size, stat.st_mtime_ns))
+    files.sort(key=lambda entry: entry.rel_path.split(os.sep))
+    return files
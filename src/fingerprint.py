@@ -0,0 +1,164 @@
+import json
+import os
+import posixpath
+import re
+
+from fsutil import write_if_changed
+from htmlnode import LeafNode, ParentNode, replace_nodes
+from inline_markdown import extract_markdown_images, extract_markdown_links
+from manifest import hash_bytes, hash_file, output_key
+
+# Files that pages and stylesheets load by URL. Anything else (HTML,
+# robots.txt, favicon.ico) keeps its name, since it is fetched by name.
+FINGERPRINT_EXTENSIONS = (".css", ".js", ".png", ".gif", ".jpg", ".jpeg", ".svg", ".webp",
+                          ".avif", ".woff", ".woff2")
+DIGEST_LENGTH = 8
+HTML_URL_RE = re.compile(r'(href|src)="(/[^"]*)"')
+CSS_URL_RE = re.compile(r"""url\(\s*(["']?)([^"')\s]+)\1\s*\)""")
+URL_TAGS = {"a": "href", "img": "src"}
+
+
+def is_fingerprinted(path):
+    return os.path.splitext(path)[1].lower() in FINGERPRINT_EXTENSIONS
+
+
+def fingerprinted_path(rel_path, digest):
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest[:DIGEST_LENGTH]}{ext}"
+
+
+def _split_url(url):
+    for index, char in enumerate(url):
+        if char in "?#":
+            return url[:index], url[index:]
+    return url, ""
+
+
+class AssetManifest:
+    # Maps the root-relative URL of each static file to the URL of its
+    # fingerprinted copy: "/index.css" -> "/index.3f9a1c2b.css".
+    def __init__(self, urls=None):
+        self.urls = urls or {}
+        self._digest = None
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def save(self, path):
+        return write_if_changed(path, json.dumps(self.urls, indent=1, sort_keys=True))
+
+    @property
+    def digest(self):
+        if self._digest is None:
+            self._digest = hash_bytes(json.dumps(self.urls, sort_keys=True).encode())
+        return self._digest
+
+    def add(self, rel_path, fingerprinted_rel_path):
+        url = "/" + rel_path.replace(os.sep, "/")
+        self.urls[url] = "/" + fingerprinted_rel_path.replace(os.sep, "/")
+        self._digest = None
+
+    def url(self, url):
+        path, suffix = _split_url(url)
+        mapped = self.urls.get(path)
+        return url if mapped is None else mapped + suffix
+
+    def output_path(self, path, dest_dir_path):
+        # The fingerprinted file behind a page dependency on `path`.
+        url = "/" + os.path.relpath(path, dest_dir_path).replace(os.sep, "/")
+        mapped = self.urls.get(url)
+        if mapped is None:
+            return path
+        return output_key(os.path.join(dest_dir_path, mapped.lstrip("/")))
+
+    def signature(self, markdown):
+        # Folded into the render cache key, like ImagePipeline.signature.
+        urls = [url for _, url in extract_markdown_images(markdown)]
+        urls.extend(url for _, url in extract_markdown_links(markdown))
+        return " ".join(self.url(url) for url in urls if _split_url(url)[0] in self.urls)
+
+    def transform(self, node):
+        def rewrite(child):
+            # Links wrapping formatted text (`[_tom_](/images/tom.png)`) are
+            # parents, so both kinds of node are checked.
+            prop = URL_TAGS.get(child.tag)
+            if prop is None or not child.props or prop not in child.props:
+                return None
+            url = self.url(child.props[prop])
+            if url == child.props[prop]:
+                return None
+            props = {**child.props, prop: url}
+            if child.children is not None:
+                return ParentNode(child.tag, child.children, props)
+            return LeafNode(child.tag, child.value, props)
+        return replace_nodes(node, rewrite)
+
+    def rewrite_html(self, html):
+        # Only used on template text, which is compiled once per build.
+        if not self.urls:
+            return html
+        return HTML_URL_RE.sub(lambda m: f'{m.group(1)}="{self.url(m.group(2))}"', html)
+
+    def rewrite_css(self, css, css_url):
+        def replace(match):
+            quote, ref = match.groups()
+            if ref.startswith("//") or ":" in ref.split("/", 1)[0]:
+                return match.group(0)
+            path, suffix = _split_url(ref)
+            if not path.startswith("/"):
+                path = posixpath.normpath(posixpath.join(posixpath.dirname(css_url), path))
+            mapped = self.urls.get(path)
+            if mapped is None:
+                return match.group(0)
+            return f"url({quote}{mapped}{suffix}{quote})"
+        return CSS_URL_RE.sub(replace, css)
+
+
+def fingerprint_static(entries, manifest, assets):
+    # Returns {source path: (fingerprinted rel path, inputs, data)}. Data is
+    # the rewritten text of a stylesheet and None for files that are copied
+    # as they are. Stylesheets go last because their url() references, and
+    # so their hashes, depend on the other assets.
+    previous = {}
+    if manifest is not None:
+        for entry in manifest.previous.values():
+            if "fingerprint" in entry and "stamp" in entry:
+                previous[entry["source"]] = entry
+    planned = {}
+    stylesheets = []
+    for entry in entries:
+        if not is_fingerprinted(entry.rel_path):
+            continue
+        if entry.rel_path.lower().endswith(".css"):
+            stylesheets.append(entry)
+            continue
+        stamp = [entry.size, entry.mtime_ns]
+        known = previous.get(entry.path)
+        if known is not None and known["stamp"] == stamp:
+            digest = known["fingerprint"]
+        elif manifest is not None:
+            digest = manifest.hash(entry.path)
+        else:
+            digest = hash_file(entry.path)
+        rel_path = fingerprinted_path(entry.rel_path, digest)
+        assets.add(entry.rel_path, rel_path)
+        inputs = {"source": entry.path, "fingerprint": digest, "stamp": stamp}
+        planned[entry.path] = (rel_path, inputs, None)
+
+    for entry in stylesheets:
+        with open(entry.path, encoding="utf-8") as f:
+            css = f.read()
+        url = "/" + entry.rel_path.replace(os.sep, "/")
+        data = assets.rewrite_css(css, url).encode("utf-8")
+        digest = hash_bytes(data)
+        rel_path = fingerprinted_path(entry.rel_path, digest)
+        assets.add(entry.rel_path, rel_path)
+        inputs = {"source": entry.path, "fingerprint": digest,
+                  "stamp": [entry.size, entry.mtime_ns]}
+        planned[entry.path] = (rel_path, inputs, data)
+    return planned
+
@@ -0,0 +1,103 @@
+import os
+import tempfile
+
+def write_if_changed(path, data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    if same_content(path, data):
+        return False
+    atomic_write(path, data)
+    return True
+
+
+def write_fragments_if_changed(path, fragments):
+    # Streams str fragments to `path`, comparing them with the current file
+    # as they come, so a page is never joined into one string. Nothing is
+    # written while they match; at the first difference the matching prefix
+    # is copied from the old file and the rest goes to a temporary file that
+    # replaces it. Returns whether the file changed and its size in bytes.
+    fragments = iter(fragments)
+    size = 0
+    pending = b""
+    try:
+        old = open(path, "rb")
+    except FileNotFoundError:
+        old = None
+    try:
+        if old is not None:
+            for fragment in fragments:
+                pending = fragment.encode("utf-8")
+                if old.read(len(pending)) != pending:
+                    break
+                size += len(pending)
+                pending = b""
+            else:
+                if old.read(1) == b"":
+                    return False, size
+        with atomic_replace(path) as tmp_path:
+            with open(tmp_path, "wb") as out:
+                if size:
+                    old.seek(0)
+                    copy_prefix(old, out, size)
+                out.write(pending)
+                size += len(pending)
+                for fragment in fragments:
+                    data = fragment.encode("utf-8")
+                    out.write(data)
+                    size += len(data)
+        return True, size
+    finally:
+        if old is not None:
+            old.close()
+
+
+def copy_prefix(src, dest, size, chunk_size=1024 * 1024):
+    while size > 0:
+        chunk = src.read(min(size, chunk_size))
+        if not chunk:
+            raise ValueError(f"{src.name} changed while it was being rewritten")
+        dest.write(chunk)
+        size -= len(chunk)
+
+
+def same_content(path, data):
+    try:
+        if os.path.getsize(path) != len(data):
+            return False
+        with open(path, "rb") as f:
+            return f.read() == data
+    except FileNotFoundError:
+        return False
+
+
+def atomic_write(path, data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    with atomic_replace(path) as tmp_path:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+
+
+class atomic_replace:
+    # Yields a temporary path next to `path` and renames it over `path` on
+    # success, so readers only ever see the old or the new file.
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = None
+
+    def __enter__(self):
+        dir_path, name = os.path.split(self.path)
+        fd, self.tmp_path = tempfile.mkstemp(dir=dir_path or ".", prefix=f".{name}.",
+                                             suffix=".tmp")
+        # Only the unique name is needed; removing the placeholder lets the
+        # caller create it with normal permissions or as a link.
+        os.close(fd)
+        os.remove(self.tmp_path)
+        return self.tmp_path
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            os.replace(self.tmp_path, self.path)
+        elif os.path.lexists(self.tmp_path):
+            os.remove(self.tmp_path)
+        return False
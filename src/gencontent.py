@@ -1,44 +1,293 @@
+import json
 import os
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from markdown_blocks import markdown_to_html_node
-
-def generate_pages_recursive(dir_path_content,
-                             template_path,
-                             dest_dir_path,
-                             basepath):
-    os.makedirs(dest_dir_path, exist_ok=True)
-    for name in os.listdir(dir_path_content):
-        from_path = os.path.join(dir_path_content, name)
-        if os.path.isdir(from_path):
-            generate_pages_recursive(
-                from_path,
-                template_path,
-                os.path.join(dest_dir_path, name),
-                basepath
-            )
+from depgraph import extract_dependencies, stamp
+from discover import CONTENT_IGNORE, DRAFT_PATTERNS, ignore_matcher, scan
+from fsutil import write_fragments_if_changed
+from instrument import StageTimer, VERBOSE, log
+from manifest import output_key
+from minify import minify_html
+import markdown_blocks
+from markdown_blocks import blocks_to_html_node, configure_inline_cache, parse_blocks
+from pipeline import run_pipeline
+from search import extract_terms
+from shard import record_shard, select_shard
+from template import load_template, rewrite_root_urls
+
+@dataclass
+class BuildContext:
+    # The settings every page is rendered with. It travels with each pool
+    # job, so it only holds plain values and picklable helpers.
+    template_path: str
+    basepath: str = "/"
+    cache: object = None
+    images: object = None
+    assets: object = None
+    minify: bool = False
+    workers: int = 1
+    pipeline: bool = False
+
+def generate_pages_recursive(dir_path_content, dest_dir_path, context, manifest=None,
+                             report=None, shard=None, search=None, sitemap=None):
+    site = collect_pages(dir_path_content, dest_dir_path)
+    pages = site if shard is None else select_shard(site, shard)
+    if shard is not None and manifest is not None:
+        record_shard(manifest, shard, site, pages, dest_dir_path)
+    if manifest is None:
+        return generate_pages(pages, context, report)
+
+    # Pages without an up-to-date search document are rendered even when
+    # their output is fresh, e.g. on the first build with --search.
+    docs = {} if search is not None else None
+    digests = {}
+
+    template = load_template(context.template_path, context.basepath, context.assets)
+    sources = [from_path for from_path, _ in site]
+    index_path = site_index_path(dir_path_content)
+    pending = []
+    for from_path, dest_path in pages:
+        site_pages = sources if from_path == index_path else None
+        inputs = page_inputs(manifest, from_path, dest_path, template, context,
+                             dest_dir_path, site_pages)
+        digests[from_path] = inputs["hash"]
+        indexed = search is None or search.is_current(
+            os.path.relpath(dest_path, dest_dir_path), inputs["hash"])
+        if not manifest.is_fresh(dest_path, inputs) or not indexed:
+            pending.append((from_path, dest_path))
+        manifest.record(dest_path, inputs)
+
+    failures = generate_pages(pending, context, report, docs)
+    failed = {from_path for from_path, _ in failures}
+    for from_path, dest_path in pending:
+        if from_path in failed:
+            manifest.keep(dest_path)
+        elif search is not None:
+            title, terms = docs[from_path]
+            search.update(os.path.relpath(dest_path, dest_dir_path), digests[from_path],
+                          title, terms)
+    if search is not None:
+        search.retain(os.path.relpath(dest_path, dest_dir_path) for _, dest_path in pages)
+    if sitemap is not None:
+        # Only pages whose hash changed are read again for their title.
+        for from_path, dest_path in pages:
+            if from_path not in failed:
+                sitemap.update(os.path.relpath(dest_path, dest_dir_path), from_path,
+                               digests[from_path])
+        sitemap.retain(os.path.relpath(dest_path, dest_dir_path) for _, dest_path in pages)
+    return failures
+
+is_draft = ignore_matcher(DRAFT_PATTERNS)
+
+def collect_pages(dir_path_content, dest_dir_path, ignore=CONTENT_IGNORE):
+    skipped = []
+    pages = [(entry.path, Path(dest_dir_path, entry.rel_path[:-3] + ".html"))
+             for entry in scan(dir_path_content, ignore, ".md", skipped)]
+    for rel_path in skipped:
+        if is_draft(os.path.basename(rel_path), rel_path):
+            log(f" - {os.path.join(dir_path_content, rel_path)} (draft, skipped)", VERBOSE)
+    return pages
+
+def page_dest_path(from_path, dir_path_content, dest_dir_path):
+    rel_path = os.path.relpath(from_path, dir_path_content)
+    return Path(os.path.join(dest_dir_path, rel_path)).with_suffix(".html")
+
+def generate_pages(pages, context, report=None, docs=None):
+    # When docs is given, it is filled with each page's (title, search terms).
+    make_dirs([dest_path for _, dest_path in pages])
+    if context.pipeline:
+        return run_pipeline(pages, context, report, docs=docs)
+
+    search = docs is not None
+    jobs = [(from_path, dest_path, context, search) for from_path, dest_path in pages]
+    workers = context.workers
+    if workers <= 1 or len(jobs) <= 1:
+        return _collect_results(map(_generate_page_job, jobs), report, docs)
+
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=configure_inline_cache,
+                             initargs=(markdown_blocks.inline_cache.capacity,)) as executor:
+        results = executor.map(_generate_page_job, jobs, chunksize=chunksize)
+        return _collect_results(results, report, docs)
+
+def _collect_results(results, report, docs=None):
+    failures = []
+    for from_path, dest_path, error, stats in results:
+        if error is not None:
+            failures.append((from_path, error))
+            continue
+        log(f" * {from_path} -> {dest_path}", VERBOSE)
+        collect_doc(from_path, stats, docs)
+        if report is not None:
+            report.add_page(stats)
+    return failures
+
+def collect_doc(from_path, stats, docs):
+    doc = stats.pop("search", None)
+    if docs is not None:
+        docs[from_path] = doc
+
+def _generate_page_job(job):
+    from_path, dest_path, _, _ = job
+    try:
+        return (from_path, dest_path, None, generate_page(*job))
+    except Exception as e:
+        return (from_path, dest_path, e, None)
+
+def site_index_path(dir_path_content):
+    return os.path.join(dir_path_content, "index.md")
+
+def page_inputs(manifest, from_path, dest_path, template, context,
+                dest_dir_path, site_pages=None):
+    digest = manifest.hash(from_path)
+    inputs = {
+        "source":   from_path,
+        "hash":     digest,
+        "template": template.digest,
+        "basepath": context.basepath,
+        "deps":     page_dependencies(manifest, from_path, dest_path, digest,
+                                      template, dest_dir_path, site_pages, context.assets),
+    }
+    if context.minify:
+        inputs["minify"] = True
+    return inputs
+
+def page_dependencies(manifest, from_path, dest_path, digest, template,
+                      dest_dir_path, site_pages=None, asset_manifest=None):
+    # References only change with the source, so an unchanged page reuses
+    # the previous build's instead of reading the markdown again. Asset
+    # stamps are always refreshed: a replaced image invalidates the page.
+    # Fingerprinted assets are recorded under their plain names and stamped
+    # through the asset manifest, so the recorded list stays valid.
+    previous = manifest.previous.get(output_key(dest_path))
+    if previous is not None and previous["hash"] == digest and "deps" in previous:
+        assets = list(previous["deps"]["assets"])
+        links  = previous["deps"]["links"]
+    else:
+        with open(from_path) as f:
+            assets, links = extract_dependencies(f.read(), dest_dir_path)
+    deps = {
+        "template": sorted(output_key(path) for path in template.sources),
+        "assets":   {path: stamp(asset_manifest.output_path(path, dest_dir_path)
+                               if asset_manifest is not None else path)
+                     for path in assets},
+        "links":    links,
+    }
+    if site_pages is not None:
+        deps["pages"] = sorted(output_key(path) for path in site_pages
+                               if path != from_path)
+    return deps
+
+def generate_page(from_path, dest_path, context, search=False):
+    timer = StageTimer(str(from_path))
+    with open(from_path) as f:
+        if context.cache is None:
+            # Without a render cache nothing needs the whole source, so the
+            # parser reads the file line by line; reading is timed as part
+            # of "blocks".
+            source = SourceLines(f)
+            html, terms = render_body(source, context, timer, search)
+            timer.bytes_in = source.size
+            if source.title is None:
+                raise ValueError(f"no title found in {from_path}")
+            title = source.title
         else:
-            if not name.endswith(".md"):
-                continue
-            dest_path = Path(os.path.join(dest_dir_path, name))\
-                        .with_suffix(".html")
-            generate_page(from_path, template_path, dest_path, basepath)
-
-def generate_page(from_path, template_path, dest_path, basepath):
-    print(f" * {from_path} -> {dest_path}")
-    markdown_content = open(from_path).read()
-    template         = open(template_path).read()
-    node = markdown_to_html_node(markdown_content)
-    html = node.to_html()
-
-    title = extract_title(markdown_content)
-    template = template.replace("{{ Title }}",   title)
-    template = template.replace("{{ Content }}", html)
-    template = template.replace('href="/', f'href="{basepath}')
-    template = template.replace('src="/',  f'src="{basepath}')
-
-    os.makedirs(dest_path.parent, exist_ok=True)
-    with open(dest_path, "w") as out:
-        out.write(template)
+            markdown_content = f.read()
+            timer.bytes_in = len(markdown_content)
+            timer.lap("read")
+            html, terms = render_body(markdown_content, context, timer, search)
+            title = extract_title(markdown_content)
+
+    template    = load_template(context.template_path, context.basepath, context.assets)
+    fragments   = render_page(template, title, html, timer, context.minify)
+
+    write_page(dest_path, fragments, timer)
+    timer.lap("write")
+    stats = timer.stats()
+    if search:
+        stats["search"] = (title, terms)
+    return stats
+
+def render_page(template, title, html, timer, minify=False):
+    # The page is produced lazily as the template's literal parts and the
+    # body, minified on the way when asked, and streamed to disk by
+    # write_page without being joined into one string.
+    fragments = template.iter_render(Title=title, Content=html)
+    if not minify:
+        return timer.timed("template", fragments)
+    return timer.timed("minify", minify_html(fragments))
+
+def write_page(dest_path, fragments, timer):
+    changed, timer.bytes_out = write_fragments_if_changed(dest_path, fragments)
+    if not changed:
+        timer.count("pages unchanged")
+
+class SourceLines:
+    # The lines of an open markdown file for the block parser, noting the
+    # title and the size read on the way, as extract_title would find them.
+    def __init__(self, f):
+        self.f = f
+        self.title = None
+        self.size = 0
+
+    def __iter__(self):
+        for line in self.f:
+            self.size += len(line)
+            if self.title is None and line.startswith("# "):
+                self.title = line[2:].rstrip("\n")
+            yield line
+
+def render_body(markdown_content, context, timer, search=False):
+    # Returns the body HTML and, when search is set, the page's search terms.
+    # The markdown is a string, or an iterable of lines when there is no
+    # render cache to key by the content.
+    cache, images, assets = context.cache, context.images, context.assets
+    body = terms = None
+    if cache is not None:
+        salt = images.signature(markdown_content, assets) if images is not None else ""
+        if assets is not None:
+            salt += " " + assets.signature(markdown_content)
+        key  = cache.key(markdown_content, salt)
+        body = cache.get(key)
+        if body is not None and search:
+            cached_terms = cache.get(key, ".terms.json")
+            terms = json.loads(cached_terms) if cached_terms is not None else None
+            if terms is None:
+                body = None
+        timer.count("render cache misses" if body is None else "render cache hits")
+    if body is None:
+        lines = (markdown_content.split("\n") if isinstance(markdown_content, str)
+                 else markdown_content)
+        blocks = list(parse_blocks(lines))
+        timer.lap("blocks")
+        inline_cache = markdown_blocks.inline_cache
+        hits, misses = inline_cache.hits, inline_cache.misses
+        node = blocks_to_html_node(blocks)
+        timer.count("inline cache hits", inline_cache.hits - hits)
+        timer.count("inline cache misses", inline_cache.misses - misses)
+        timer.lap("inline")
+        if assets is not None:
+            timer.count("asset urls rewritten", assets.transform(node))
+            timer.lap("assets")
+        if images is not None:
+            timer.count("images sized", images.transform(node))
+            timer.lap("images")
+        body = node.to_html()
+        if search:
+            terms = extract_terms(node)
+        if cache is not None:
+            cache.put(key, body)
+            if search:
+                cache.put(key, json.dumps(terms), ".terms.json")
+    html = rewrite_root_urls(body, context.basepath)
+    timer.lap("to_html")
+    return html, terms
+
+def make_dirs(paths):
+    for dir_path in sorted({os.path.dirname(path) for path in paths}):
+        os.makedirs(dir_path, exist_ok=True)
 
 def extract_title(md):
     for line in md.splitlines():
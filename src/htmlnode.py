@@ -1,4 +1,6 @@
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -8,19 +10,21 @@ class HTMLNode:
     def to_html(self):
         raise NotImplementedError("to_html method not implemented")
 
+    def iter_html(self):
+        raise NotImplementedError("iter_html method not implemented")
+
     def props_to_html(self):
         if self.props is None:
             return ""
-        props_html = ""
-        for prop in self.props:
-            props_html += f' {prop}="{self.props[prop]}"'
-        return props_html
+        return "".join([f' {prop}="{value}"' for prop, value in self.props.items()])
 
     def __repr__(self):
         return f"HTMLNode({self.tag}, {self.value}, children: {self.children}, {self.props})"
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
 
@@ -31,23 +35,65 @@ class LeafNode(HTMLNode):
             return self.value
         return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
 
+    def iter_html(self):
+        yield self.to_html()
+
     def __repr__(self):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
 
     def to_html(self):
+        return "".join(self.iter_html())
+
+    def iter_html(self):
+        # Walk with an explicit stack so deeply nested trees don't hit the
+        # recursion limit; each open tag is a single fragment.
+        yield self._open_tag()
+        stack = [(self, iter(self.children))]
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                yield f"</{node.tag}>"
+            elif isinstance(child, ParentNode):
+                yield child._open_tag()
+                stack.append((child, iter(child.children)))
+            else:
+                yield child.to_html()
+
+    def _open_tag(self):
         if self.tag is None:
             raise ValueError("invalid HTML: no tag")
         if self.children is None:
             raise ValueError("invalid HTML: no children")
-        children_html = ""
-        for child in self.children:
-            children_html += child.to_html()
-        return f"<{self.tag}{self.props_to_html()}>{children_html}</{self.tag}>"
+        return f"<{self.tag}{self.props_to_html()}>"
 
     def __repr__(self):
         return f"ParentNode({self.tag}, children: {self.children}, {self.props})"
+
+
+def replace_nodes(node, replace):
+    # Calls replace() on every node below `node`; a node it returns takes the
+    # old one's place. Subtrees may be shared with the inline cache, so each
+    # parent is copied on the way down and only the copies are changed.
+    replaced = 0
+    stack = [node]
+    while stack:
+        children = stack.pop().children
+        for index, child in enumerate(children):
+            new = replace(child)
+            if new is not None:
+                child = new
+                replaced += 1
+            if child.children is not None:
+                child = ParentNode(child.tag, list(child.children), child.props)
+                stack.append(child)
+            children[index] = child
+    return replaced
@@ -0,0 +1,166 @@
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+from copystatic import copy_file
+from depgraph import local_output_path
+from fsutil import atomic_replace
+from htmlnode import LeafNode, replace_nodes
+from inline_markdown import extract_markdown_images
+from instrument import VERBOSE, log
+
+IMAGE_EXTENSIONS = (".png", ".gif", ".jpg", ".jpeg")
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Start-of-frame markers; C4, C8 and CC share the range but are not frames.
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def image_size(path):
+    # Only the header is read, so sizing an image costs one small read.
+    with open(path, "rb") as f:
+        head = f.read(24)
+        if head.startswith(PNG_SIGNATURE) and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+        if head.startswith(b"\xff\xd8"):
+            f.seek(2)
+            return _jpeg_size(f)
+    return None
+
+
+def _jpeg_size(f):
+    while True:
+        byte = f.read(1)
+        if byte != b"\xff":
+            return None
+        while byte == b"\xff":
+            byte = f.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            continue
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        if marker in JPEG_SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">xHH", frame)
+            return width, height
+        f.seek(struct.unpack(">H", length)[0] - 2, os.SEEK_CUR)
+
+
+def is_image(path):
+    return os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+
+
+def variant_path(path, width):
+    root, ext = os.path.splitext(path)
+    return f"{root}-{width}w{ext}"
+
+
+class ImagePipeline:
+    def __init__(self, dest_dir_path, cache_dir, widths=(), lazy=True):
+        self.dest_dir_path = dest_dir_path
+        self.cache_dir = cache_dir
+        # Resized variants need Pillow; without it images are only sized.
+        self.widths = tuple(sorted(set(widths))) if Image is not None else ()
+        self.lazy = lazy
+        self._sizes = {}
+
+    def size(self, path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        if key not in self._sizes:
+            self._sizes[key] = image_size(path)
+        return self._sizes[key]
+
+    def variant_widths(self, width):
+        return [variant for variant in self.widths if variant < width]
+
+    def attributes(self, url):
+        path = local_output_path(url, self.dest_dir_path)
+        if path is None or not is_image(path):
+            return {}
+        size = self.size(path)
+        if size is None:
+            return {}
+        width, height = size
+        attributes = {"width": str(width), "height": str(height)}
+        if self.lazy:
+            attributes["loading"] = "lazy"
+        variants = self.variant_widths(width)
+        if variants:
+            candidates = [f"{variant_path(url, variant)} {variant}w" for variant in variants]
+            candidates.append(f"{url} {width}w")
+            attributes["srcset"] = ", ".join(candidates)
+        return attributes
+
+    def signature(self, markdown, assets=None):
+        # Folded into the render cache key, so a cached body is not reused
+        # once an image it embeds has been resized or replaced.
+        parts = []
+        for _, url in extract_markdown_images(markdown):
+            if assets is not None:
+                url = assets.url(url)
+            parts.extend(f"{name}={value}" for name, value in self.attributes(url).items())
+        return " ".join(parts)
+
+    def transform(self, node):
+        def size(child):
+            if child.tag != "img":
+                return None
+            attributes = self.attributes(child.props["src"])
+            if not attributes:
+                return None
+            return LeafNode("img", child.value, {**child.props, **attributes})
+        return replace_nodes(node, size)
+
+    def sync_variants(self, files, manifest, link="copy", workers=4):
+        jobs = []
+        for from_path, dest_path in files:
+            if not self.widths or not is_image(from_path):
+                continue
+            size = image_size(from_path)
+            if size is None:
+                continue
+            digest = manifest.hash(from_path)
+            for width in self.variant_widths(size[0]):
+                out_path = variant_path(dest_path, width)
+                inputs = {"source": from_path, "hash": digest, "width": width}
+                if not manifest.is_current(out_path, inputs):
+                    jobs.append((from_path, out_path, digest, width))
+                manifest.record(out_path, inputs)
+
+        def place(job):
+            from_path, out_path, digest, width = job
+            log(f" * {from_path} -> {out_path}", VERBOSE)
+            copy_file(self.variant(from_path, digest, width), out_path, link)
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            list(executor.map(place, jobs))
+        return len(jobs)
+
+    def variant(self, from_path, digest, width):
+        # Variants are cached by source hash, so each is resized only once
+        # however often the output directory is cleaned or rebuilt.
+        ext = os.path.splitext(from_path)[1].lower()
+        path = os.path.join(self.cache_dir, digest[:2], f"{digest}-{width}w{ext}")
+        if os.path.exists(path):
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with Image.open(from_path) as image, atomic_replace(path) as tmp_path:
+            height = max(1, round(image.height * width / image.width))
+            image.resize((width, height), Image.LANCZOS).save(tmp_path, format=image.format)
+        return path
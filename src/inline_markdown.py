@@ -3,22 +3,78 @@ import re
 from textnode import TextNode, TextType
 
 
+IMAGE_RE = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_RE = re.compile(r"\[([^\[\]]*)\]\(([^\(\)]*)\)")
+# LINK_RE is matched at a known "[", this one searches and must skip images.
+LINK_SEARCH_RE = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+INLINE_TOKEN_RE = re.compile(r"\*\*|!\[|[_`\[]")
+
+DELIMITERS = {
+    "**": TextType.BOLD,
+    "_": TextType.ITALIC,
+    "`": TextType.CODE,
+}
+
+
 def text_to_textnodes(text):
-    nodes = [TextNode(text, TextType.TEXT)]
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+    # Single left-to-right scan. Links and images are matched where they
+    # start, so delimiters inside them stay part of their text; a delimiter
+    # without a closing partner is kept as literal text.
+    if not has_inline_markup(text):
+        return [TextNode(text, TextType.TEXT)] if text else []
+    nodes = []
+    pending = 0
+    pos = 0
+    while True:
+        match = INLINE_TOKEN_RE.search(text, pos)
+        if match is None:
+            break
+        start = match.start()
+        token = match.group()
+        if token == "![" or token == "[":
+            pattern = IMAGE_RE if token == "![" else LINK_RE
+            found = pattern.match(text, start)
+            if found is None:
+                pos = start + len(token)
+                continue
+            text_type = TextType.IMAGE if token == "![" else TextType.LINK
+            if start > pending:
+                nodes.append(TextNode(text[pending:start], TextType.TEXT))
+            nodes.append(TextNode(found.group(1), text_type, found.group(2)))
+            pending = pos = found.end()
+            continue
+        end = text.find(token, start + len(token))
+        if end == -1:
+            pos = start + len(token)
+            continue
+        if start > pending:
+            nodes.append(TextNode(text[pending:start], TextType.TEXT))
+        inner = text[start + len(token):end]
+        if inner != "":
+            nodes.append(TextNode(inner, DELIMITERS[token]))
+        pending = pos = end + len(token)
+    if pending < len(text):
+        nodes.append(TextNode(text[pending:], TextType.TEXT))
     return nodes
 
 
+def has_inline_markup(text):
+    # Every token starts with one of these characters; plain prose is ruled
+    # out by four substring scans before the regex is needed.
+    if not ("[" in text or "*" in text or "_" in text or "`" in text):
+        return False
+    return INLINE_TOKEN_RE.search(text) is not None
+
+
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     new_nodes = []
     for old_node in old_nodes:
         if old_node.text_type != TextType.TEXT:
             new_nodes.append(old_node)
             continue
+        if old_node.text and delimiter not in old_node.text:
+            new_nodes.append(old_node)
+            continue
         split_nodes = []
         sections = old_node.text.split(delimiter)
         if len(sections) % 2 == 0:
@@ -89,12 +145,12 @@ def split_nodes_link(old_nodes):
 
 
 def extract_markdown_images(text):
-    pattern = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(pattern, text)
-    return matches
+    if "![" not in text:
+        return []
+    return IMAGE_RE.findall(text)
 
 
 def extract_markdown_links(text):
-    pattern = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(pattern, text)
-    return matches
+    if "[" not in text:
+        return []
+    return LINK_SEARCH_RE.findall(text)
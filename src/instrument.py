@@ -0,0 +1,162 @@
+import json
+import os
+import sys
+import time
+
+QUIET   = 0
+NORMAL  = 1
+VERBOSE = 2
+
+PAGE_STAGES = ("read", "blocks", "inline", "to_html", "template", "write")
+
+verbosity = NORMAL
+
+
+def set_verbosity(level):
+    global verbosity
+    verbosity = level
+
+
+def log(message, level=NORMAL):
+    if verbosity >= level:
+        print(message)
+
+
+def log_error(message):
+    print(message, file=sys.stderr)
+
+
+class StageTimer:
+    def __init__(self, name):
+        self.name = name
+        self.pid = os.getpid()
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.stages = []
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.counters = {}
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def timed(self, stage, fragments):
+        # Times a stage that runs lazily while its output is consumed, such
+        # as filling the template as a page is written. Its time is left
+        # out of the lap that consumes it.
+        spent = 0.0
+        fragments = iter(fragments)
+        while True:
+            start = time.perf_counter()
+            fragment = next(fragments, None)
+            spent += time.perf_counter() - start
+            if fragment is None:
+                break
+            yield fragment
+        self.stages.append((stage, spent))
+        self.last += spent
+
+    def stats(self):
+        return {
+            "name":      self.name,
+            "pid":       self.pid,
+            "start":     self.start,
+            "stages":    self.stages,
+            "total":     self.last - self.start,
+            "bytes_in":  self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "counters":  self.counters,
+        }
+
+
+class BuildReport:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.end = None
+        self.pages = []
+        self.static_files = 0
+        self.static_bytes = 0
+        self.counters = {}
+
+    def add_page(self, stats):
+        self.pages.append(stats)
+        for name, amount in stats["counters"].items():
+            self.count(name, amount)
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_static(self, size):
+        self.static_files += 1
+        self.static_bytes += size
+
+    def finish(self):
+        self.end = time.perf_counter()
+
+    @property
+    def wall_time(self):
+        return (self.end or time.perf_counter()) - self.start
+
+    def stage_totals(self):
+        totals = dict.fromkeys(PAGE_STAGES, 0.0)
+        for page in self.pages:
+            for stage, seconds in page["stages"]:
+                totals[stage] = totals.get(stage, 0.0) + seconds
+        return totals
+
+    def slowest(self, count):
+        return sorted(self.pages, key=lambda page: page["total"], reverse=True)[:count]
+
+    def format(self, slowest=10):
+        bytes_in = sum(page["bytes_in"] for page in self.pages)
+        bytes_out = sum(page["bytes_out"] for page in self.pages)
+        lines = [
+            f"Build report ({self.wall_time * 1000:.0f} ms wall time)",
+            f"  pages:   {len(self.pages)}, {bytes_in} bytes in, {bytes_out} bytes out",
+            f"  static:  {self.static_files} file(s) copied, {self.static_bytes} bytes",
+            "  stages (summed over pages):",
+        ]
+        for stage, seconds in self.stage_totals().items():
+            lines.append(f"    {stage:<10} {seconds * 1000:9.1f} ms")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"  {name}: {value}")
+        if self.pages and slowest:
+            lines.append(f"  slowest {min(slowest, len(self.pages))} page(s):")
+            for page in self.slowest(slowest):
+                lines.append(f"    {page['total'] * 1000:9.1f} ms  {page['name']}")
+        return "\n".join(lines)
+
+    def to_dict(self):
+        return {
+            "wall_time":    self.wall_time,
+            "stage_totals": self.stage_totals(),
+            "static_files": self.static_files,
+            "static_bytes": self.static_bytes,
+            "counters":     self.counters,
+            "pages":        self.pages,
+        }
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    def write_chrome_trace(self, path):
+        # Chrome trace event format; open with chrome://tracing or Perfetto.
+        events = []
+        for page in self.pages:
+            ts = (page["start"] - self.start) * 1e6
+            events.append({"name": page["name"], "ph": "X", "ts": ts,
+                           "dur": page["total"] * 1e6,
+                           "pid": page["pid"], "tid": page["pid"]})
+            for stage, seconds in page["stages"]:
+                events.append({"name": stage, "ph": "X", "ts": ts,
+                               "dur": seconds * 1e6, "cat": "stage",
+                               "pid": page["pid"], "tid": page["pid"]})
+                ts += seconds * 1e6
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
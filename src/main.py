@@ -1,32 +1,245 @@
+import argparse
 import os
 import shutil
 import sys  
-from copystatic import copy_files_recursive
-from gencontent import generate_pages_recursive
+from functools import partial
+from compress import MIN_SIZE, precompress
+from copystatic import collect_files, sync_static
+from discover import STATIC_IGNORE
+from fingerprint import AssetManifest
+from gencontent import BuildContext, generate_pages_recursive
+from images import Image, ImagePipeline
+from instrument import BuildReport, NORMAL, QUIET, VERBOSE, log, log_error, set_verbosity
+from manifest import Manifest
+from markdown_blocks import configure_inline_cache
+from rendercache import RenderCache
+from search import SearchIndex
+from shard import merge_shards, parse_shard, shard_paths
+from sitemap import Sitemap
 
 dir_path_static  = "./static"
 dir_path_public  = "./docs"
 dir_path_content = "./content"
 template_path    = "./template.html"
+manifest_path    = "./.ssg-manifest.json"
+dir_path_cache   = "./.ssg-cache"
+dir_path_shards  = "./.ssg-shards"
+search_path      = os.path.join(dir_path_cache, "search.json")
+sitemap_path     = os.path.join(dir_path_cache, "sitemap.json")
 
-def main():
-    basepath = sys.argv[1] if len(sys.argv) > 1 else "/"
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build the static site.")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only rebuild outputs whose inputs changed")
+    parser.add_argument("--clean", action="store_true",
+                        help="delete the output directory before building")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(),
+                        help="number of processes used to render pages")
+    parser.add_argument("--static-compare", choices=("mtime", "hash"), default="mtime",
+                        help="how to detect unchanged static files")
+    parser.add_argument("--link", choices=("copy", "hardlink", "reflink"), default="copy",
+                        help="how to place static files in the output directory")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="always parse markdown instead of reusing rendered bodies")
+    parser.add_argument("--cache-size", type=int, default=256, metavar="MB",
+                        help="size limit of the rendered body cache")
+    parser.add_argument("--inline-cache", type=int, default=4096, metavar="N",
+                        help="number of parsed inline fragments to reuse (0 disables)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="overlap reads, rendering and writes (for slow disks)")
+    parser.add_argument("--no-images", dest="images", action="store_false",
+                        help="leave <img> tags without dimensions or lazy loading")
+    parser.add_argument("--image-widths", type=parse_widths, default=[], metavar="W,W,…",
+                        help="widths of resized image variants for srcset (needs Pillow)")
+    parser.add_argument("--search", action="store_true",
+                        help="write a search index to the search/ output directory")
+    parser.add_argument("--site-url", type=lambda url: url.rstrip("/"), metavar="URL",
+                        help="write sitemap.xml and blog/feed.xml for the site at URL")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="add a content hash to the names of static assets")
+    parser.add_argument("--minify", action="store_true",
+                        help="collapse whitespace in generated pages")
+    parser.add_argument("--precompress", action="store_true",
+                        help="write .gz (and .br with brotli installed) copies of text outputs")
+    parser.add_argument("--precompress-min-size", type=int, default=MIN_SIZE, metavar="BYTES",
+                        help="smallest output to precompress")
+    parser.add_argument("--shard", type=parse_shard, metavar="I/N",
+                        help="only render shard I of N into its own directory under "
+                             + dir_path_shards)
+    parser.add_argument("--merge-shards", type=int, metavar="N",
+                        help="combine the output of shards 1..N into the public directory")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument("-q", "--quiet", action="store_const", dest="verbosity",
+                           const=QUIET, default=NORMAL, help="only print errors")
+    verbosity.add_argument("-v", "--verbose", action="store_const", dest="verbosity",
+                           const=VERBOSE, help="print every file written")
+    parser.add_argument("--report", type=int, nargs="?", const=10, metavar="N",
+                        help="print a timing report listing the N slowest pages")
+    parser.add_argument("--report-json", metavar="PATH",
+                        help="write the timing report as JSON")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="write a Chrome trace of page stages")
+    return parser.parse_args(argv)
 
-    print("Deleting public directory…")
-    if os.path.exists(dir_path_public):
-        shutil.rmtree(dir_path_public)
+def parse_widths(value):
+    return [int(width) for width in value.split(",") if width]
 
-    print("Copying static files to public directory…")
-    copy_files_recursive(dir_path_static, dir_path_public)
+def image_pipeline(options, dest_dir_path=dir_path_public):
+    if not options.images:
+        return None
+    if options.image_widths and Image is None:
+        log_error("Pillow is not installed; images are sized but not resized")
+    return ImagePipeline(dest_dir_path, os.path.join(dir_path_cache, "images"),
+                         options.image_widths)
 
-    print("Generating content…")
-    # pass basepath through
-    generate_pages_recursive(
-        dir_path_content,
-        template_path,
-        dir_path_public,
-        basepath
-    )
+def shard_search_path(shard):
+    manifest_file = shard_paths(dir_path_shards, shard)[1]
+    return os.path.splitext(manifest_file)[0] + ".search.json"
+
+def shard_sitemap_path(shard):
+    manifest_file = shard_paths(dir_path_shards, shard)[1]
+    return os.path.splitext(manifest_file)[0] + ".sitemap.json"
+
+def write_sitemap(sitemap, manifest, dest_dir_path, options):
+    # Recorded in the manifest, so the files are pruned once --site-url is
+    # dropped or the last blog post is removed.
+    paths = sitemap.write(dest_dir_path, options.basepath, options.site_url)
+    for path in paths:
+        manifest.record(path, {"source": sitemap.path, "site_url": options.site_url})
+    return paths
+
+def write_search(search, manifest, dest_dir_path, options):
+    # Recorded like the sitemap: dropping --search prunes the index, prefix
+    # files that are gone are removed, and --precompress sees index.json.
+    paths = search.write(os.path.join(dest_dir_path, "search"), options.basepath)
+    for path in paths:
+        manifest.record(path, {"source": search.path})
+    return paths
+
+def build(options, report=None, cache=None):
+    # A shard renders its share of the pages into its own directory, which
+    # gets a full copy of the static files for image sizing.
+    dest_dir_path, manifest_file = dir_path_public, manifest_path
+    search_file, sitemap_file = search_path, sitemap_path
+    if options.shard is not None:
+        dest_dir_path, manifest_file = shard_paths(dir_path_shards, options.shard)
+        search_file = shard_search_path(options.shard)
+        sitemap_file = shard_sitemap_path(options.shard)
+    manifest = Manifest.load(manifest_file)
+    search = SearchIndex.load(search_file) if options.search else None
+    sitemap = Sitemap.load(sitemap_file) if options.site_url else None
+    # A full build re-renders everything but keeps unchanged files in
+    # place, so mtimes only move for outputs whose bytes changed.
+    manifest.force = not options.incremental
+    if options.clean:
+        log("Deleting public directory…")
+        if os.path.exists(dest_dir_path):
+            shutil.rmtree(dest_dir_path)
+
+    log("Copying static files to public directory…")
+    assets = AssetManifest() if options.fingerprint else None
+    sync_static(dir_path_static, dest_dir_path, manifest,
+                options.static_compare, options.link,
+                max(4, options.workers or 1), report, assets)
+    if assets is not None:
+        assets_path = os.path.join(dest_dir_path, "assets.json")
+        assets.save(assets_path)
+        manifest.record(assets_path, {"source": dir_path_static, "assets": assets.digest})
+    images = image_pipeline(options, dest_dir_path)
+    if images is not None:
+        images.sync_variants(collect_files(dir_path_static, dest_dir_path, assets), manifest,
+                             options.link, max(4, options.workers or 1))
+
+    log("Generating content…")
+    context = BuildContext(template_path, options.basepath, cache=cache, images=images,
+                           assets=assets, minify=options.minify,
+                           workers=options.workers or 1, pipeline=options.pipeline)
+    failures = generate_pages_recursive(dir_path_content, dest_dir_path, context, manifest,
+                                        report=report, shard=options.shard, search=search,
+                                        sitemap=sitemap)
+    if search is not None:
+        search.save()
+        # Shards only keep their documents; the merge writes the index.
+        if options.shard is None:
+            write_search(search, manifest, dest_dir_path, options)
+    if sitemap is not None:
+        sitemap.save()
+        if options.shard is None:
+            write_sitemap(sitemap, manifest, dest_dir_path, options)
+    if options.precompress:
+        log("Compressing outputs…")
+        precompress(manifest, list(manifest.outputs), options.precompress_min_size,
+                    max(4, options.workers or 1))
+
+    removed = manifest.prune(dest_dir_path)
+    if not options.incremental:
+        # A full build owns the output directory apart from version control
+        # files, so anything it did not write is stale.
+        removed += manifest.sweep(dest_dir_path, STATIC_IGNORE)
+    for path in removed:
+        log(f" - {path}", VERBOSE)
+    manifest.save()
+    if cache is not None:
+        cache.evict()
+    return failures
+
+def report_failures(failures):
+    if failures:
+        log_error(f"{len(failures)} page(s) failed:")
+        for from_path, error in failures:
+            log_error(f" ! {from_path}: {error}")
+
+def merge(options):
+    log(f"Merging {options.merge_shards} shard(s) into public directory…")
+    problems = merge_shards(dir_path_shards, options.merge_shards, dir_path_public,
+                            manifest_path, options.link, partial(merge_site_files, options))
+    for problem in problems:
+        log_error(f" ! {problem}")
+    return 1 if problems else 0
+
+def merge_site_files(options, manifest):
+    # The search index and sitemap cover every shard's pages, so they are
+    # only written once the shards are merged.
+    if options.search:
+        search = SearchIndex.load(search_path)
+        search.docs = {}
+        for index in range(1, options.merge_shards + 1):
+            shard = SearchIndex.load(shard_search_path((index, options.merge_shards)))
+            search.docs.update(shard.docs)
+        search.save()
+        write_search(search, manifest, dir_path_public, options)
+    if options.site_url:
+        sitemap = Sitemap.load(sitemap_path)
+        sitemap.pages = {}
+        for index in range(1, options.merge_shards + 1):
+            shard = Sitemap.load(shard_sitemap_path((index, options.merge_shards)))
+            sitemap.pages.update(shard.pages)
+        sitemap.save()
+        write_sitemap(sitemap, manifest, dir_path_public, options)
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    set_verbosity(args.verbosity)
+    if args.merge_shards:
+        return merge(args)
+    configure_inline_cache(args.inline_cache)
+    report = BuildReport()
+    cache = None
+    if args.cache:
+        cache = RenderCache(os.path.join(dir_path_cache, "html"),
+                            args.cache_size * 1024 * 1024)
+    failures = build(args, report, cache)
+    report.finish()
+    report_failures(failures)
+
+    if args.report is not None:
+        print(report.format(args.report))
+    if args.report_json:
+        report.write_json(args.report_json)
+    if args.trace:
+        report.write_chrome_trace(args.trace)
+    return 1 if failures else 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
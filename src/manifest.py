@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+
+from discover import scan
+from fsutil import atomic_write
+
+MANIFEST_VERSION = 2
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    def __init__(self, path, previous=None, info=None):
+        self.path = path
+        self.previous = previous or {}
+        self.outputs = {}
+        self.info = info or {}
+        self.force = False
+        self._hashes = {}
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls(path)
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, data.get("outputs", {}), data.get("info"))
+
+    def hash(self, path):
+        if path not in self._hashes:
+            self._hashes[path] = hash_file(path)
+        return self._hashes[path]
+
+    def invalidate(self, path):
+        self._hashes.pop(path, None)
+
+    def is_fresh(self, dest_path, inputs):
+        if self.force:
+            return False
+        entry = self.previous.get(output_key(dest_path))
+        return entry == inputs and os.path.exists(dest_path)
+
+    def is_current(self, dest_path, inputs):
+        # Unlike is_fresh this ignores force, for outputs whose inputs are
+        # content hashes: identical bytes in give identical bytes out, so a
+        # full build can reuse them too.
+        key = output_key(dest_path)
+        entry = self.outputs.get(key, self.previous.get(key))
+        return entry == inputs and os.path.exists(dest_path)
+
+    def record(self, dest_path, inputs):
+        self.outputs[output_key(dest_path)] = inputs
+
+    def keep(self, dest_path):
+        key = output_key(dest_path)
+        if key in self.previous:
+            self.outputs[key] = self.previous[key]
+        else:
+            self.outputs.pop(key, None)
+
+    def forget(self, dest_path):
+        self.outputs.pop(output_key(dest_path), None)
+
+    def stale_outputs(self):
+        return sorted(set(self.previous) - set(self.outputs))
+
+    def prune(self, root):
+        removed = []
+        for dest_path in self.stale_outputs():
+            if os.path.isfile(dest_path):
+                os.remove(dest_path)
+                removed.append(dest_path)
+            remove_empty_parents(os.path.dirname(dest_path), root)
+        return removed
+
+    def sweep(self, root, ignore=()):
+        # Removes the files under root that were not recorded as outputs,
+        # e.g. ones left by a build without a manifest. Files matching
+        # ignore are kept.
+        removed = []
+        for entry in scan(root, ignore):
+            if output_key(entry.path) not in self.outputs:
+                os.remove(entry.path)
+                removed.append(entry.path)
+                remove_empty_parents(os.path.dirname(entry.path), root)
+        return removed
+
+    def save(self):
+        data = {"version": MANIFEST_VERSION, "outputs": self.outputs}
+        if self.info:
+            data["info"] = self.info
+        atomic_write(self.path, json.dumps(data, indent=1, sort_keys=True))
+
+
+def output_key(dest_path):
+    return os.path.normpath(dest_path)
+
+
+def remove_empty_parents(dir_path, root):
+    root = os.path.abspath(root)
+    dir_path = os.path.abspath(dir_path)
+    while dir_path != root and dir_path.startswith(root + os.sep):
+        if not os.path.isdir(dir_path) or os.listdir(dir_path):
+            return
+        os.rmdir(dir_path)
+        dir_path = os.path.dirname(dir_path)
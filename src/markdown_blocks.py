@@ -1,7 +1,8 @@
+from collections import OrderedDict
 from enum import Enum
 
 from htmlnode import ParentNode
-from inline_markdown import text_to_textnodes
+from inline_markdown import text_to_textnodes, has_inline_markup
 from textnode import text_node_to_html_node, TextNode, TextType
 
 
@@ -14,35 +15,86 @@ class BlockType(Enum):
     ULIST = "unordered_list"
 
 
-def markdown_to_blocks(markdown):
-    blocks = markdown.split("\n\n")
-    filtered_blocks = []
-    for block in blocks:
-        if block == "":
+class Block:
+    def __init__(self, block_type, lines, start=None, end=None):
+        self.block_type = block_type
+        self.lines = lines
+        self.start = start
+        self.end = end
+
+    @property
+    def text(self):
+        return "\n".join(self.lines)
+
+    def __repr__(self):
+        return f"Block({self.block_type.value}, lines {self.start}-{self.end})"
+
+
+def parse_blocks(lines):
+    # State machine over lines: blank lines end a block, except inside a
+    # fenced code block, which runs until its closing fence. Accepts any
+    # iterable of lines, such as an open file.
+    buffer = []
+    start = 0
+    in_fence = False
+    number = 0
+    for number, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if in_fence:
+            buffer.append(line)
+            if line.strip().startswith("```"):
+                yield Block(BlockType.CODE, buffer, start, number)
+                buffer = []
+                in_fence = False
+            continue
+        if line.strip() == "":
+            if buffer:
+                yield _finish_block(buffer, start, number - 1)
+                buffer = []
             continue
-        block = block.strip()
-        filtered_blocks.append(block)
-    return filtered_blocks
+        if not buffer:
+            start = number
+            line = line.lstrip()
+            if line.startswith("```") and "```" not in line[3:]:
+                in_fence = True
+        buffer.append(line)
+    if buffer:
+        if in_fence:
+            yield Block(BlockType.CODE, buffer, start, number)
+        else:
+            yield _finish_block(buffer, start, number)
+
+
+def _finish_block(lines, start, end):
+    lines[-1] = lines[-1].rstrip()
+    return Block(block_type_from_lines(lines), lines, start, end)
+
+
+def markdown_to_blocks(markdown):
+    return [block.text for block in parse_blocks(markdown.split("\n"))]
 
 
 def block_to_block_type(block):
-    lines = block.split("\n")
+    return block_type_from_lines(block.split("\n"))
+
 
-    if block.startswith(("# ", "## ", "### ", "#### ", "##### ", "###### ")):
+def block_type_from_lines(lines):
+    first = lines[0]
+    if first.startswith(("# ", "## ", "### ", "#### ", "##### ", "###### ")):
         return BlockType.HEADING
-    if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
+    if len(lines) > 1 and first.startswith("```") and lines[-1].startswith("```"):
         return BlockType.CODE
-    if block.startswith(">"):
+    if first.startswith(">"):
         for line in lines:
             if not line.startswith(">"):
                 return BlockType.PARAGRAPH
         return BlockType.QUOTE
-    if block.startswith("- "):
+    if first.startswith("- "):
         for line in lines:
             if not line.startswith("- "):
                 return BlockType.PARAGRAPH
         return BlockType.ULIST
-    if block.startswith("1. "):
+    if first.startswith("1. "):
         i = 1
         for line in lines:
             if not line.startswith(f"{i}. "):
@@ -53,7 +105,12 @@ def block_to_block_type(block):
 
 
 def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
+    if isinstance(markdown, str):
+        markdown = markdown.split("\n")
+    return blocks_to_html_node(parse_blocks(markdown))
+
+
+def blocks_to_html_node(blocks):
     children = []
     for block in blocks:
         html_node = block_to_html_node(block)
@@ -62,84 +119,162 @@ def markdown_to_html_node(markdown):
 
 
 def block_to_html_node(block):
-    block_type = block_to_block_type(block)
+    if isinstance(block, str):
+        lines = block.split("\n")
+        block = Block(block_type_from_lines(lines), lines)
+    block_type = block.block_type
+    lines = block.lines
     if block_type == BlockType.PARAGRAPH:
-        return paragraph_to_html_node(block)
+        return paragraph_to_html_node(lines)
     if block_type == BlockType.HEADING:
-        return heading_to_html_node(block)
+        return heading_to_html_node(lines)
     if block_type == BlockType.CODE:
-        return code_to_html_node(block)
+        return code_to_html_node(lines)
     if block_type == BlockType.OLIST:
-        return olist_to_html_node(block)
+        return olist_to_html_node(lines)
     if block_type == BlockType.ULIST:
-        return ulist_to_html_node(block)
+        return ulist_to_html_node(lines)
     if block_type == BlockType.QUOTE:
-        return quote_to_html_node(block)
+        return quote_to_html_node(lines)
     raise ValueError("invalid block type")
 
 
+HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+
+NESTING_TAGS = {
+    TextType.BOLD: "b",
+    TextType.ITALIC: "i",
+    TextType.LINK: "a",
+}
+
+
+class InlineCache:
+    # Bounded LRU of inline parse results. Cached children are shared
+    # between callers, so they must be treated as immutable.
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text):
+        children = self.entries.get(text)
+        if children is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(text)
+        return children
+
+    def put(self, text, children):
+        if self.capacity <= 0:
+            return
+        self.entries[text] = children
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+
+inline_cache = InlineCache()
+
+
+def configure_inline_cache(capacity):
+    global inline_cache
+    inline_cache = InlineCache(capacity)
+
+
 def text_to_children(text):
+    cached = inline_cache.get(text)
+    if cached is not None:
+        return list(cached)
+    children = parse_children(text)
+    inline_cache.put(text, tuple(children))
+    return children
+
+
+def parse_children(text):
     text_nodes = text_to_textnodes(text)
     children = []
     for text_node in text_nodes:
-        html_node = text_node_to_html_node(text_node)
+        if text_node.text_type in NESTING_TAGS and has_inline_markup(text_node.text):
+            html_node = nested_text_node_to_html_node(text_node)
+        else:
+            html_node = text_node_to_html_node(text_node)
         children.append(html_node)
     return children
 
 
-def paragraph_to_html_node(block):
-    lines = block.split("\n")
+def nested_text_node_to_html_node(text_node):
+    props = None
+    if text_node.text_type == TextType.LINK:
+        props = {"href": text_node.url}
+    tag = NESTING_TAGS[text_node.text_type]
+    return ParentNode(tag, text_to_children(text_node.text), props)
+
+
+def _block_lines(block):
+    # The builders take a block's lines, or its text as before the line
+    # parser.
+    return block.split("\n") if isinstance(block, str) else block
+
+
+def paragraph_to_html_node(lines):
+    lines = _block_lines(lines)
     paragraph = " ".join(lines)
     children = text_to_children(paragraph)
     return ParentNode("p", children)
 
 
-def heading_to_html_node(block):
+def heading_to_html_node(lines):
+    block = "\n".join(_block_lines(lines))
     level = 0
     for char in block:
         if char == "#":
             level += 1
         else:
             break
-    if level + 1 >= len(block):
+    if level + 1 >= len(block) or level > len(HEADING_TAGS):
         raise ValueError(f"invalid heading level: {level}")
     text = block[level + 1 :]
     children = text_to_children(text)
-    return ParentNode(f"h{level}", children)
+    return ParentNode(HEADING_TAGS[level - 1], children)
 
 
-def code_to_html_node(block):
-    if not block.startswith("```") or not block.endswith("```"):
+def code_to_html_node(lines):
+    lines = _block_lines(lines)
+    if not lines[0].startswith("```"):
         raise ValueError("invalid code block")
-    text = block[4:-3]
+    body = lines[1:]
+    if body and body[-1].strip().startswith("```"):
+        body = body[:-1]
+    text = "".join([line + "\n" for line in body])
     raw_text_node = TextNode(text, TextType.TEXT)
     child = text_node_to_html_node(raw_text_node)
     code = ParentNode("code", [child])
     return ParentNode("pre", [code])
 
 
-def olist_to_html_node(block):
-    items = block.split("\n")
+def olist_to_html_node(lines):
+    lines = _block_lines(lines)
     html_items = []
-    for item in items:
-        text = item[3:]
+    for item in lines:
+        text = item[item.index(". ") + 2:]
         children = text_to_children(text)
         html_items.append(ParentNode("li", children))
     return ParentNode("ol", html_items)
 
 
-def ulist_to_html_node(block):
-    items = block.split("\n")
+def ulist_to_html_node(lines):
+    lines = _block_lines(lines)
     html_items = []
-    for item in items:
+    for item in lines:
         text = item[2:]
         children = text_to_children(text)
         html_items.append(ParentNode("li", children))
     return ParentNode("ul", html_items)
 
 
-def quote_to_html_node(block):
-    lines = block.split("\n")
+def quote_to_html_node(lines):
+    lines = _block_lines(lines)
     new_lines = []
     for line in lines:
         if not line.startswith(">"):
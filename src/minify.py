@@ -0,0 +1,99 @@
+import re
+
+# Elements whose content is kept byte for byte; code blocks are <pre><code>.
+PRESERVE_TAGS = ("pre", "textarea", "script", "style")
+# Whitespace next to these tags is never rendered, so it is dropped; the
+# rest is collapsed to a single space.
+BLOCK_TAGS = (
+    "html", "head", "body", "title", "meta", "link", "base", "script", "style",
+    "article", "aside", "section", "nav", "header", "footer", "main", "div", "p", "hr", "br",
+    "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li", "dl", "dt", "dd", "blockquote",
+    "pre", "figure", "figcaption", "table", "caption", "thead", "tbody", "tfoot", "tr",
+    "th", "td", "form", "fieldset", "textarea", "details", "summary",
+)
+# Only ASCII whitespace collapses in HTML; a no-break space must survive.
+WHITESPACE = " \t\n\r\f\v"
+_BLOCK = rf"<(?:/?(?:{'|'.join(BLOCK_TAGS)})\b|![dD][oO][cC][tT][yY][pP][eE]\b)"
+BLOCK_TAG_RE = re.compile(rf"{_BLOCK}[^>]*>\Z")
+SPACE_RE = re.compile(r"[ \t\n\r\f\v]{2,}|[\t\n\r\f\v]")
+# Run after SPACE_RE, so every run of whitespace is a single space. Both
+# start with a literal, which lets the regex engine skip ahead quickly.
+BEFORE_BLOCK_RE = re.compile(rf" (?={_BLOCK})")
+AFTER_BLOCK_RE = re.compile(rf"({_BLOCK}[^>]*>) ")
+PRESERVE_START_RE = re.compile(rf"<({'|'.join(PRESERVE_TAGS)})\b[^>]*>", re.IGNORECASE)
+PRESERVE_END_RE = {name: re.compile(rf"</{name}\b", re.IGNORECASE) for name in PRESERVE_TAGS}
+
+
+def minify_html(fragments):
+    minifier = Minifier()
+    for fragment in fragments:
+        yield from minifier.feed(fragment)
+    yield from minifier.finish()
+
+
+class Minifier:
+    # Works on the fragments as they are rendered, with a few regex passes
+    # per fragment, so a page is never tokenized or re-parsed as a whole.
+    # Trailing whitespace is held back until the next fragment shows
+    # whether it sits next to a block tag. Tags are assumed not to be split
+    # across fragments, which holds for templates and node output.
+    def __init__(self):
+        self.preserve = None
+        self.held = ""
+        self.space = False
+        self.after_block = True
+
+    def feed(self, fragment):
+        out = []
+        text = self.held + fragment
+        self.held = ""
+        pos = 0
+        while pos < len(text):
+            if self.preserve is not None:
+                end = PRESERVE_END_RE[self.preserve].search(text, pos)
+                if end is None:
+                    # Hold back what could be the start of the closing tag.
+                    split = max(pos, len(text) - len(self.preserve) - 2)
+                    out.append(text[pos:split])
+                    self.held = text[split:]
+                    break
+                out.append(text[pos:end.start()])
+                self.preserve = None
+                self.after_block = False
+                pos = end.start()
+            start = PRESERVE_START_RE.search(text, pos)
+            if start is None:
+                self._collapse(text[pos:], out)
+                break
+            self._collapse(text[pos:start.end()], out)
+            self.preserve = start.group(1).lower()
+            pos = start.end()
+        return out
+
+    def finish(self):
+        # Text held back inside a preserved element is flushed as is. Pending
+        # whitespace outside one ends the page and is dropped.
+        held, self.held = self.held, ""
+        return [held] if held else []
+
+    def _collapse(self, text, out):
+        if self.space:
+            text = " " + text
+        if self.after_block:
+            text = text.lstrip(WHITESPACE)
+        # Rendered bodies rarely contain newlines or double spaces, and
+        # these substring checks are far cheaper than a regex scan.
+        if "  " in text or "\n" in text or "\t" in text or "\r" in text:
+            text = SPACE_RE.sub(" ", text)
+        if " <" in text:
+            text = BEFORE_BLOCK_RE.sub("", text)
+        if "> " in text:
+            text = AFTER_BLOCK_RE.sub(r"\1", text)
+        stripped = text.rstrip(WHITESPACE)
+        if stripped:
+            self.space = len(stripped) != len(text)
+            self.after_block = (stripped[-1] == ">"
+                                and BLOCK_TAG_RE.search(stripped, stripped.rfind("<")) is not None)
+            out.append(stripped)
+        elif text:
+            self.space = True
@@ -0,0 +1,98 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import gencontent
+import markdown_blocks
+from instrument import StageTimer, VERBOSE, log
+from template import load_template
+
+
+def run_pipeline(pages, context, report=None, prefetch=None, writers=4, docs=None):
+    workers = max(1, context.workers)
+    return asyncio.run(_pipeline(pages, context, workers, report, prefetch or workers * 4,
+                                 writers, docs))
+
+
+async def _pipeline(pages, context, workers, report, prefetch, writers, docs):
+    # Reads are prefetched on I/O threads, pages render in a process pool,
+    # and a bounded queue feeds the writers so rendered pages can't pile
+    # up in memory faster than they are flushed.
+    loop = asyncio.get_running_loop()
+    failures = []
+    in_flight = asyncio.Semaphore(prefetch)
+    queue = asyncio.Queue(maxsize=prefetch)
+
+    async def render(from_path, dest_path):
+        async with in_flight:
+            try:
+                start = loop.time()
+                markdown_content = await loop.run_in_executor(io_pool, _read, from_path)
+                read_time = loop.time() - start
+                page, stats = await loop.run_in_executor(
+                    cpu_pool, _render_job,
+                    (from_path, markdown_content, context, docs is not None))
+            except Exception as e:
+                failures.append((from_path, e))
+                return
+            stats["stages"].insert(0, ("read", read_time))
+            stats["total"] += read_time
+            await queue.put((from_path, dest_path, page, stats))
+
+    async def write():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            from_path, dest_path, page, stats = item
+            timer = StageTimer(str(from_path))
+            try:
+                await loop.run_in_executor(io_pool, gencontent.write_page,
+                                           dest_path, page, timer)
+            except Exception as e:
+                failures.append((from_path, e))
+                continue
+            timer.lap("write")
+            write_time = timer.last - timer.start
+            stats["bytes_out"] = timer.bytes_out
+            for name, amount in timer.counters.items():
+                stats["counters"][name] = stats["counters"].get(name, 0) + amount
+            stats["stages"].append(("write", write_time))
+            stats["total"] += write_time
+            log(f" * {from_path} -> {dest_path}", VERBOSE)
+            gencontent.collect_doc(from_path, stats, docs)
+            if report is not None:
+                report.add_page(stats)
+
+    io_pool = ThreadPoolExecutor(max_workers=prefetch + writers)
+    cpu_pool = ProcessPoolExecutor(max_workers=workers,
+                                   initializer=markdown_blocks.configure_inline_cache,
+                                   initargs=(markdown_blocks.inline_cache.capacity,))
+    with io_pool, cpu_pool:
+        writer_tasks = [asyncio.create_task(write()) for _ in range(writers)]
+        await asyncio.gather(*(render(from_path, dest_path)
+                               for from_path, dest_path in pages))
+        for _ in writer_tasks:
+            await queue.put(None)
+        await asyncio.gather(*writer_tasks)
+    return sorted(failures, key=lambda failure: str(failure[0]))
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def _render_job(job):
+    from_path, markdown_content, context, search = job
+    timer = StageTimer(str(from_path))
+    timer.bytes_in = len(markdown_content)
+    html, terms = gencontent.render_body(markdown_content, context, timer, search)
+    title = gencontent.extract_title(markdown_content)
+    template = load_template(context.template_path, context.basepath, context.assets)
+    # Fragments are kept apart on their way to the writer, which streams
+    # them to disk; only the pool boundary needs them materialized.
+    page = list(gencontent.render_page(template, title, html, timer, context.minify))
+    stats = timer.stats()
+    if search:
+        stats["search"] = (title, terms)
+    return page, stats
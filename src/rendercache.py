@@ -0,0 +1,73 @@
+import hashlib
+import os
+
+from fsutil import atomic_write
+
+PARSER_MODULES = ("htmlnode.py", "textnode.py", "inline_markdown.py", "markdown_blocks.py",
+                  "images.py", "search.py", "fingerprint.py")
+
+
+def parser_version():
+    # Any change to the parser sources invalidates every cached body.
+    digest = hashlib.sha256()
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in PARSER_MODULES:
+        with open(os.path.join(src_dir, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+PARSER_VERSION = parser_version()
+
+
+class RenderCache:
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def key(self, markdown, salt=""):
+        digest = hashlib.sha256(PARSER_VERSION.encode())
+        digest.update(markdown.encode())
+        digest.update(salt.encode())
+        return digest.hexdigest()
+
+    def _path(self, key, ext=".html"):
+        return os.path.join(self.cache_dir, key[:2], key + ext)
+
+    def get(self, key, ext=".html"):
+        path = self._path(key, ext)
+        try:
+            with open(path, encoding="utf-8") as f:
+                html = f.read()
+        except FileNotFoundError:
+            return None
+        # mtime doubles as the last-used time for LRU eviction
+        os.utime(path)
+        return html
+
+    def put(self, key, html, ext=".html"):
+        path = self._path(key, ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write(path, html)
+
+    def evict(self):
+        entries = []
+        total = 0
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        for dir_path, _, file_names in os.walk(self.cache_dir):
+            for name in file_names:
+                path = os.path.join(dir_path, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+                total += stat.st_size
+
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
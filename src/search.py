@@ -0,0 +1,139 @@
+import gzip
+import itertools
+import json
+import os
+import re
+
+from fsutil import atomic_write, write_if_changed
+
+SEARCH_VERSION = 1
+PREFIX_LENGTH = 2
+TOKEN_RE = re.compile(r"\w\w+")
+STOPWORDS = frozenset(
+    "an and are as at be but by for from has have in is it its of on or that "
+    "the this to was were which with".split()
+)
+# Weight of a term by the tag it appears under; the h1-h6 nodes come from
+# heading_to_html_node.
+TAG_WEIGHTS = {"h1": 8, "h2": 4, "h3": 2, "h4": 2, "h5": 2, "h6": 2}
+SKIP_TAGS = ("pre",)
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def extract_terms(node):
+    terms = {}
+    stack = [(node, 1)]
+    while stack:
+        node, weight = stack.pop()
+        if node.children is None:
+            if node.value:
+                for token in tokenize(node.value):
+                    terms[token] = terms.get(token, 0) + weight
+            continue
+        if node.tag in SKIP_TAGS:
+            continue
+        weight = TAG_WEIGHTS.get(node.tag, weight)
+        stack.extend((child, weight) for child in node.children)
+    return terms
+
+
+def page_url(rel_path, basepath):
+    rel_path = rel_path.replace(os.sep, "/")
+    if rel_path == "index.html" or rel_path.endswith("/index.html"):
+        rel_path = rel_path[:-len("index.html")]
+    return basepath + rel_path
+
+
+class SearchIndex:
+    # Per-page documents persist between builds, so only re-rendered pages
+    # are tokenized again. Document ids are kept stable so a page change
+    # only rewrites the prefix files its terms fall into.
+    def __init__(self, path, docs=None, ids=None):
+        self.path = path
+        self.docs = docs or {}
+        self.ids = ids or {}
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls(path)
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != SEARCH_VERSION:
+            return cls(path)
+        return cls(path, data["docs"], data["ids"])
+
+    def is_current(self, rel_path, digest):
+        doc = self.docs.get(rel_path)
+        return doc is not None and doc["hash"] == digest
+
+    def update(self, rel_path, digest, title, terms):
+        self.docs[rel_path] = {"hash": digest, "title": title, "terms": terms}
+
+    def remove(self, rel_path):
+        self.docs.pop(rel_path, None)
+
+    def retain(self, rel_paths):
+        for rel_path in set(self.docs) - set(rel_paths):
+            del self.docs[rel_path]
+
+    def save(self):
+        data = {"version": SEARCH_VERSION, "docs": self.docs, "ids": self.ids}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        atomic_write(self.path, json.dumps(data, separators=(",", ":"), sort_keys=True))
+
+    def assign_ids(self):
+        for rel_path in set(self.ids) - set(self.docs):
+            del self.ids[rel_path]
+        used = set(self.ids.values())
+        free = (doc_id for doc_id in itertools.count() if doc_id not in used)
+        for rel_path in sorted(self.docs):
+            if rel_path not in self.ids:
+                self.ids[rel_path] = next(free)
+        return self.ids
+
+    def write(self, dest_dir_path, basepath):
+        # Postings are flat [doc id delta, weight, ...] lists, grouped into
+        # one gzipped file per term prefix; index.json lists the prefixes.
+        # Returns the files produced, each only rewritten when its bytes
+        # changed; files of prefixes that are gone are pruned by the manifest.
+        ids = self.assign_ids()
+        docs = [None] * (max(ids.values(), default=-1) + 1)
+        postings = {}
+        for rel_path, doc in self.docs.items():
+            doc_id = ids[rel_path]
+            docs[doc_id] = [page_url(rel_path, basepath), doc["title"]]
+            for term, weight in doc["terms"].items():
+                postings.setdefault(term, []).append((doc_id, weight))
+
+        shards = {}
+        for term, entries in postings.items():
+            flat = []
+            previous = 0
+            for doc_id, weight in sorted(entries):
+                flat.extend((doc_id - previous, weight))
+                previous = doc_id
+            shards.setdefault(term[:PREFIX_LENGTH], {})[term] = flat
+
+        os.makedirs(dest_dir_path, exist_ok=True)
+        files = {"docs.json.gz": docs}
+        files.update((f"{prefix}.json.gz", terms) for prefix, terms in sorted(shards.items()))
+        paths = []
+        for name, data in files.items():
+            path = os.path.join(dest_dir_path, name)
+            _write_gzip_json(path, data)
+            paths.append(path)
+        meta = {"version": SEARCH_VERSION, "prefix_length": PREFIX_LENGTH,
+                "docs": len(docs), "prefixes": sorted(shards)}
+        index_path = os.path.join(dest_dir_path, "index.json")
+        write_if_changed(index_path, json.dumps(meta, separators=(",", ":")))
+        paths.append(index_path)
+        return paths
+
+
+def _write_gzip_json(path, data):
+    text = json.dumps(data, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+    return write_if_changed(path, gzip.compress(text.encode("utf-8"), mtime=0))
@@ -0,0 +1,146 @@
+import argparse
+import filecmp
+import hashlib
+import os
+
+from copystatic import copy_file
+from instrument import VERBOSE, log
+from manifest import Manifest, output_key
+
+
+def parse_shard(value):
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected I/N, got {value!r}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard {index} is not between 1 and {count}")
+    return index, count
+
+
+def shard_paths(shard_root, shard):
+    name = f"{shard[0]}-of-{shard[1]}"
+    return os.path.join(shard_root, name), os.path.join(shard_root, name + ".json")
+
+
+def _rank(key, shard):
+    return hashlib.sha256(f"{shard}:{key}".encode()).digest()
+
+
+def assign_shards(pages, count):
+    # Every page prefers shards in a stable, hash-derived order, so most
+    # pages keep their shard as the site grows. Pages are placed largest
+    # first and skip shards that would go over an even share of the bytes;
+    # a page that fits nowhere goes to the least loaded shard, so no shard
+    # ends up more than one page over its share.
+    sizes = {from_path: os.path.getsize(from_path) for from_path, _ in pages}
+    capacity = sum(sizes.values()) / count
+    loads = [0] * count
+    assignment = {}
+    for from_path in sorted(sizes, key=lambda path: (-sizes[path], str(path))):
+        preferred = sorted(range(count), key=lambda shard: _rank(str(from_path), shard))
+        fitting = [shard for shard in preferred if loads[shard] + sizes[from_path] <= capacity]
+        shard = fitting[0] if fitting else min(range(count), key=loads.__getitem__)
+        loads[shard] += sizes[from_path]
+        assignment[from_path] = shard + 1
+    return assignment
+
+
+def select_shard(pages, shard):
+    assignment = assign_shards(pages, shard[1])
+    return [(from_path, dest_path) for from_path, dest_path in pages
+            if assignment[from_path] == shard[0]]
+
+
+def record_shard(manifest, shard, pages, selected, dest_dir_path):
+    manifest.info["shard"] = {
+        "index": shard[0],
+        "count": shard[1],
+        "root":  output_key(dest_dir_path),
+        "site":  sorted(os.path.relpath(dest_path, dest_dir_path) for _, dest_path in pages),
+        "pages": sorted(os.path.relpath(dest_path, dest_dir_path) for _, dest_path in selected),
+    }
+
+
+def merge_shards(shard_root, count, dest_dir_path, manifest_path, link="copy", finish=None):
+    # Pages must come from exactly one shard and cover the whole site.
+    # Static files are synced by every shard, so they are taken from the
+    # first shard that has them. `finish` is called with the merged
+    # manifest before it is pruned, to write and record site-wide outputs.
+    problems = []
+    sources = {}
+    entries = {}
+    owners = {}
+    site = None
+    for index in range(1, count + 1):
+        out_dir, shard_manifest_path = shard_paths(shard_root, (index, count))
+        if not os.path.exists(shard_manifest_path):
+            problems.append(f"shard {index}/{count}: no manifest at {shard_manifest_path}")
+            continue
+        shard = Manifest.load(shard_manifest_path)
+        info = shard.info.get("shard")
+        if info is None or (info["index"], info["count"]) != (index, count):
+            problems.append(f"shard {index}/{count}: manifest is not for this shard")
+            continue
+        if site is None:
+            site = info["site"]
+        elif info["site"] != site:
+            problems.append(f"shard {index}/{count}: built from a different set of pages")
+
+        # Output keys are relative to wherever the shard ran, so they are
+        # resolved against the root it recorded rather than out_dir.
+        pages = set(info["pages"])
+        for key, entry in shard.previous.items():
+            rel_path = os.path.relpath(key, info["root"])
+            if rel_path in pages:
+                if rel_path in owners:
+                    problems.append(f"{rel_path}: rendered by shards {owners[rel_path]} "
+                                    f"and {index}")
+                    continue
+                owners[rel_path] = index
+            elif rel_path in sources:
+                continue
+            sources[rel_path] = os.path.join(out_dir, rel_path)
+            entries[rel_path] = remap_entry(entry, info["root"], dest_dir_path)
+
+    for rel_path in site or []:
+        if rel_path not in owners:
+            problems.append(f"{rel_path}: not rendered by any shard")
+        elif not os.path.exists(sources[rel_path]):
+            problems.append(f"{rel_path}: missing from shard {owners[rel_path]}")
+    if problems:
+        return problems
+
+    manifest = Manifest.load(manifest_path)
+    for rel_path, from_path in sorted(sources.items()):
+        dest_path = os.path.join(dest_dir_path, rel_path)
+        unchanged = (os.path.exists(dest_path)
+                     and filecmp.cmp(from_path, dest_path, shallow=False))
+        if not unchanged:
+            log(f" * {from_path} -> {dest_path}", VERBOSE)
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            copy_file(from_path, dest_path, link)
+        manifest.record(dest_path, entries[rel_path])
+    if finish is not None:
+        finish(manifest)
+    for removed in manifest.prune(dest_dir_path):
+        log(f" - {removed}", VERBOSE)
+    manifest.save()
+    return []
+
+
+def remap_entry(entry, old_root, new_root):
+    # Dependency paths point into the shard's output directory.
+    def remap(path):
+        rel_path = os.path.relpath(path, old_root)
+        if rel_path.startswith(os.pardir):
+            return path
+        return output_key(os.path.join(new_root, rel_path))
+
+    entry = dict(entry)
+    deps = entry.get("deps")
+    if deps is not None:
+        entry["deps"] = dict(deps,
+                             assets={remap(path): stamp for path, stamp in deps["assets"].items()},
+                             links=[remap(path) for path in deps["links"]])
+    return entry
@@ -0,0 +1,113 @@
+import json
+import os
+import time
+from xml.sax.saxutils import escape, quoteattr
+
+from fsutil import atomic_write, write_if_changed
+from gencontent import extract_title
+from search import page_url
+
+SITEMAP_VERSION = 1
+FEED_SECTION = "blog"
+FEED_SIZE = 20
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+ATOM_NS = "http://www.w3.org/2005/Atom"
+
+
+def format_time(seconds):
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(seconds))
+
+
+class Sitemap:
+    # Each page's title and last modification time persist between builds
+    # and are only refreshed when its content hash changes, so touching a
+    # file does not move its lastmod and unchanged pages are never read.
+    def __init__(self, path, pages=None):
+        self.path = path
+        self.pages = pages or {}
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls(path)
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != SITEMAP_VERSION:
+            return cls(path)
+        return cls(path, data["pages"])
+
+    def is_current(self, rel_path, digest):
+        page = self.pages.get(rel_path)
+        return page is not None and page["hash"] == digest
+
+    def update(self, rel_path, from_path, digest):
+        if self.is_current(rel_path, digest):
+            return False
+        with open(from_path) as f:
+            title = extract_title(f.read())
+        self.pages[rel_path] = {"hash": digest, "title": title,
+                                "lastmod": format_time(os.path.getmtime(from_path))}
+        return True
+
+    def remove(self, rel_path):
+        self.pages.pop(rel_path, None)
+
+    def retain(self, rel_paths):
+        for rel_path in set(self.pages) - set(rel_paths):
+            del self.pages[rel_path]
+
+    def save(self):
+        data = {"version": SITEMAP_VERSION, "pages": self.pages}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        atomic_write(self.path, json.dumps(data, separators=(",", ":"), sort_keys=True))
+
+    def write(self, dest_dir_path, basepath, site_url):
+        # Returns the files produced. They are only rewritten when a page
+        # was added, removed or changed, so their mtimes stay put otherwise.
+        sitemap_path = os.path.join(dest_dir_path, "sitemap.xml")
+        write_if_changed(sitemap_path, self.sitemap_xml(basepath, site_url))
+        feed = self.feed_xml(basepath, site_url)
+        if feed is None:
+            return [sitemap_path]
+        feed_path = os.path.join(dest_dir_path, FEED_SECTION, "feed.xml")
+        os.makedirs(os.path.dirname(feed_path), exist_ok=True)
+        write_if_changed(feed_path, feed)
+        return [sitemap_path, feed_path]
+
+    def sitemap_xml(self, basepath, site_url):
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>', f'<urlset xmlns="{SITEMAP_NS}">']
+        for rel_path, page in sorted(self.pages.items()):
+            loc = escape(site_url + page_url(rel_path, basepath))
+            lines.append(f"<url><loc>{loc}</loc><lastmod>{page['lastmod']}</lastmod></url>")
+        lines.append("</urlset>")
+        return "\n".join(lines) + "\n"
+
+    def feed_xml(self, basepath, site_url):
+        index = FEED_SECTION + "/index.html"
+        entries = [(rel_path, page) for rel_path, page in self.pages.items()
+                   if rel_path.replace(os.sep, "/").startswith(FEED_SECTION + "/")
+                   and rel_path.replace(os.sep, "/") != index]
+        if not entries:
+            return None
+        entries.sort(key=lambda entry: (entry[1]["lastmod"], entry[0]), reverse=True)
+        entries = entries[:FEED_SIZE]
+        home = self.pages.get(os.path.normpath(index)) or self.pages.get("index.html")
+        title = home["title"] if home is not None else FEED_SECTION
+        feed_url = site_url + basepath + FEED_SECTION + "/"
+        lines = [
+            '<?xml version="1.0" encoding="utf-8"?>',
+            f'<feed xmlns="{ATOM_NS}">',
+            f"<title>{escape(title)}</title>",
+            f"<id>{escape(feed_url)}</id>",
+            f"<link href={quoteattr(feed_url + 'feed.xml')} rel=\"self\"/>",
+            f"<link href={quoteattr(feed_url)}/>",
+            f"<updated>{entries[0][1]['lastmod']}</updated>",
+            f"<author><name>{escape(title)}</name></author>",
+        ]
+        for rel_path, page in entries:
+            url = site_url + page_url(rel_path, basepath)
+            lines.append(f"<entry><title>{escape(page['title'])}</title>"
+                         f"<link href={quoteattr(url)}/><id>{escape(url)}</id>"
+                         f"<updated>{page['lastmod']}</updated></entry>")
+        lines.append("</feed>")
+        return "\n".join(lines) + "\n"
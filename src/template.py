@@ -0,0 +1,115 @@
+import hashlib
+import os
+import re
+
+TAG_RE = re.compile(r"\{\{\s*(>?)\s*([\w./-]+)\s*\}\}")
+ROOT_URL_RE = re.compile(r'(href|src)="/')
+SRCSET_RE = re.compile(r'srcset="([^"]*)"')
+
+_cache = {}
+
+
+class Template:
+    def __init__(self, path, basepath="/", assets=None):
+        self.path = path
+        self.basepath = basepath
+        self.assets = assets
+        self.sources = {}
+        self.parts = []
+        self.slots = []
+        digest = hashlib.sha256()
+        self._compile(path, digest, ())
+        if assets is not None:
+            # Fingerprinted URLs are part of the output, so pages are
+            # rebuilt when an asset the template loads changes.
+            for part in self.parts:
+                if part is not None:
+                    digest.update(part.encode())
+        self.digest = digest.hexdigest()
+
+    def _compile(self, path, digest, including):
+        if path in including:
+            raise ValueError(f"recursive template partial: {path}")
+        with open(path) as f:
+            text = f.read()
+        self.sources[path] = os.stat(path).st_mtime_ns
+        digest.update(text.encode())
+
+        pos = 0
+        for match in TAG_RE.finditer(text):
+            self._add_literal(text[pos:match.start()])
+            is_partial, name = match.groups()
+            if is_partial:
+                partial_path = os.path.join(os.path.dirname(path), name)
+                self._compile(partial_path, digest, including + (path,))
+            else:
+                self.slots.append((len(self.parts), name))
+                self.parts.append(None)
+            pos = match.end()
+        self._add_literal(text[pos:])
+
+    def _add_literal(self, literal):
+        if literal == "":
+            return
+        if self.assets is not None:
+            literal = self.assets.rewrite_html(literal)
+        literal = rewrite_root_urls(literal, self.basepath)
+        if self.parts and self.parts[-1] is not None:
+            self.parts[-1] += literal
+        else:
+            self.parts.append(literal)
+
+    def render(self, **values):
+        parts = list(self.parts)
+        for index, name in self.slots:
+            if name not in values:
+                raise ValueError(f"missing template value: {name}")
+            value = values[name]
+            parts[index] = value if isinstance(value, str) else "".join(value)
+        return "".join(parts)
+
+    def iter_render(self, **values):
+        for _, name in self.slots:
+            if name not in values:
+                raise ValueError(f"missing template value: {name}")
+        names = dict(self.slots)
+        for index, part in enumerate(self.parts):
+            if part is not None:
+                yield part
+                continue
+            value = values[names[index]]
+            if isinstance(value, str):
+                yield value
+            else:
+                yield from value
+
+
+def load_template(path, basepath="/", assets=None):
+    key = (os.path.abspath(path), basepath, assets.digest if assets is not None else None)
+    template = _cache.get(key)
+    if template is None or _is_outdated(template):
+        template = Template(path, basepath, assets)
+        _cache[key] = template
+    return template
+
+
+def _is_outdated(template):
+    for path, mtime in template.sources.items():
+        if not os.path.exists(path) or os.stat(path).st_mtime_ns != mtime:
+            return True
+    return False
+
+
+def rewrite_root_urls(html, basepath):
+    if basepath == "/":
+        return html
+    html = ROOT_URL_RE.sub(lambda m: f'{m.group(1)}="{basepath}', html)
+    if "srcset=" in html:
+        html = SRCSET_RE.sub(lambda m: _rewrite_srcset(m.group(1), basepath), html)
+    return html
+
+
+def _rewrite_srcset(srcset, basepath):
+    candidates = [basepath + candidate[1:] if candidate.startswith("/") else candidate
+                  for candidate in srcset.split(", ")]
+    return f'srcset="{", ".join(candidates)}"'
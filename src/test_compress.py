@@ -0,0 +1,75 @@
+import gzip
+import os
+import unittest
+
+from compress import brotli, precompress
+from fixtures import TempDirTestCase
+from manifest import Manifest
+
+
+class TestPrecompress(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.manifest_path = os.path.join(self.root, "manifest.json")
+        self.page = self.write("index.html", "<p>Rivendell</p>" * 100)
+        self.small = self.write("small.css", "p { margin: 0 }")
+        self.image = self.write("rivendell.png", "\x89PNG" * 1000)
+
+    def build(self, force=True):
+        manifest = Manifest.load(self.manifest_path)
+        manifest.force = force
+        for path in (self.page, self.small, self.image):
+            manifest.record(path, {"source": path})
+        written = precompress(manifest, list(manifest.outputs), min_size=256)
+        manifest.prune(self.root)
+        manifest.save()
+        return written
+
+    def test_only_large_text_outputs_are_compressed(self):
+        self.build()
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "<p>Rivendell</p>" * 100)
+        self.assertFalse(os.path.exists(self.small + ".gz"))
+        self.assertFalse(os.path.exists(self.image + ".gz"))
+
+    def test_unchanged_outputs_are_not_recompressed(self):
+        encodings = 2 if brotli is not None else 1
+        self.assertEqual(self.build(), encodings)
+        self.assertEqual(self.build(), 0)
+
+        self.write("index.html", "<p>Lothlorien</p>" * 100)
+        self.assertEqual(self.build(), encodings)
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "<p>Lothlorien</p>" * 100)
+
+    def test_untouched_outputs_are_not_read(self):
+        self.build()
+        # Same size and mtime: the output is taken as unchanged unread.
+        stat = os.stat(self.page)
+        self.write("index.html", "<p>Lothlorie</p>" * 100)
+        os.utime(self.page, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(self.build(), 0)
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "<p>Rivendell</p>" * 100)
+
+    def test_touched_outputs_keep_their_variants(self):
+        self.build()
+        os.utime(self.page, ns=(0, 0))
+        self.assertEqual(self.build(), 0)
+        self.assertEqual(self.build(force=False), 0)
+
+    def test_variants_of_shrunk_outputs_are_pruned(self):
+        self.build()
+        self.write("index.html", "<p>Bree</p>")
+        self.build()
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+
+    @unittest.skipIf(brotli is None, "brotli is not installed")
+    def test_brotli(self):
+        self.build()
+        with open(self.page + ".br", "rb") as f:
+            self.assertEqual(brotli.decompress(f.read()), b"<p>Rivendell</p>" * 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
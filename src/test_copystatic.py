@@ -0,0 +1,60 @@
+import os
+import unittest
+
+from fixtures import TempDirTestCase
+from copystatic import copy_file, sync_static
+from manifest import Manifest
+
+
+class TestSyncStatic(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.public = os.path.join(self.root, "public")
+        self.write("static/index.css", "body {}")
+        self.write("static/images/a.png", "png")
+
+    def read(self, name):
+        with open(os.path.join(self.public, name)) as f:
+            return f.read()
+
+    def test_skips_unchanged_files(self):
+        for compare in ("mtime", "hash"):
+            manifest = Manifest(os.path.join(self.root, compare + ".json"))
+            sync_static(self.static, self.public, manifest, compare)
+            # Default builds are forced; unchanged static files are still skipped.
+            manifest = Manifest(manifest.path, manifest.outputs)
+            manifest.force = True
+            self.assertEqual(sync_static(self.static, self.public, manifest, compare), 0)
+
+    def test_copies_changed_files(self):
+        sync_static(self.static, self.public)
+        path = self.write("static/index.css", "body { color: red }")
+        os.utime(path, ns=(0, 0))
+        self.assertEqual(sync_static(self.static, self.public), 1)
+        self.assertEqual(self.read("index.css"), "body { color: red }")
+        self.assertEqual(self.read("images/a.png"), "png")
+
+    def test_hardlink_does_not_write_through(self):
+        sync_static(self.static, self.public, link="hardlink")
+        dest_path = os.path.join(self.public, "index.css")
+        self.assertEqual(os.stat(dest_path).st_nlink, 2)
+
+        copy_file(os.path.join(self.static, "images/a.png"), dest_path)
+        with open(os.path.join(self.static, "index.css")) as f:
+            self.assertEqual(f.read(), "body {}")
+
+    def test_records_outputs_for_pruning(self):
+        manifest = Manifest(os.path.join(self.root, "m.json"))
+        sync_static(self.static, self.public, manifest)
+        os.remove(os.path.join(self.static, "images/a.png"))
+
+        manifest = Manifest(manifest.path, manifest.outputs)
+        sync_static(self.static, self.public, manifest)
+        manifest.prune(self.public)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.css")))
+
+
+if __name__ == "__main__":
+    unittest.main()
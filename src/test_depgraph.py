@@ -0,0 +1,98 @@
+import os
+import unittest
+
+from fixtures import TempDirTestCase
+from depgraph import DependencyGraph, extract_dependencies, local_output_path
+from gencontent import BuildContext, generate_pages_recursive
+from manifest import Manifest
+
+
+class TestExtractDependencies(unittest.TestCase):
+    def test_local_output_path(self):
+        self.assertEqual(local_output_path("/images/a.png", "docs"), "docs/images/a.png")
+        self.assertEqual(local_output_path("/blog/tom#top", "docs"),
+                         "docs/blog/tom/index.html")
+        self.assertIsNone(local_output_path("https://example.com/a.png", "docs"))
+        self.assertIsNone(local_output_path("//cdn.example.com/a.png", "docs"))
+        self.assertIsNone(local_output_path("relative.png", "docs"))
+
+    def test_extract_dependencies(self):
+        markdown = (
+            "![a](/images/a.png) [home](/) [tom](/blog/tom)\n\n"
+            "![remote](https://example.com/b.png) [again](/blog/tom?x=1)"
+        )
+        assets, links = extract_dependencies(markdown, "docs")
+        self.assertEqual(assets, ["docs/images/a.png"])
+        self.assertEqual(links, ["docs/blog/tom/index.html", "docs/index.html"])
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = DependencyGraph.from_outputs({
+            "docs/index.html": {
+                "source": "content/index.md",
+                "deps": {
+                    "template": ["template.html"],
+                    "assets":   {"docs/images/a.png": [1, 2]},
+                    "links":    ["docs/tom/index.html"],
+                    "pages":    ["content/tom/index.md"],
+                },
+            },
+            "docs/tom/index.html": {
+                "source": "content/tom/index.md",
+                "deps": {"template": ["template.html", "partials/nav.html"],
+                         "assets": {}, "links": []},
+            },
+            "docs/images/a.png": {"source": "static/images/a.png"},
+        })
+
+    def test_affected_follows_assets_to_pages(self):
+        self.assertEqual(self.graph.affected(["./static/images/a.png"]),
+                         {"docs/images/a.png", "docs/index.html"})
+
+    def test_affected_by_partial(self):
+        self.assertEqual(self.graph.affected(["partials/nav.html"]),
+                         {"docs/tom/index.html"})
+        self.assertEqual(self.graph.affected(["template.html"]),
+                         {"docs/index.html", "docs/tom/index.html"})
+
+    def test_links_do_not_invalidate(self):
+        self.assertEqual(self.graph.affected(["docs/tom/index.html"]), set())
+        self.assertEqual(self.graph.dependents_of("docs/tom/index.html", ("links",)),
+                         ["docs/index.html"])
+
+
+class TestIncrementalDependencies(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "public")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest_path = os.path.join(self.root, "manifest.json")
+        self.write("template.html", "{{ Content }}")
+        self.write("content/index.md", "# Home\n\n![a](/a.png)")
+        self.write("content/post.md", "# Post")
+        self.image = self.write("public/a.png", "png")
+
+    def build(self):
+        manifest = Manifest.load(self.manifest_path)
+        generate_pages_recursive(self.content, self.public, BuildContext(self.template),
+                                 manifest)
+        manifest.save()
+        return {os.path.basename(entry["source"])
+                for key, entry in manifest.outputs.items()
+                if manifest.previous.get(key) != entry}
+
+    def test_only_affected_pages_rebuild(self):
+        self.assertEqual(self.build(), {"index.md", "post.md"})
+        self.assertEqual(self.build(), set())
+
+        os.utime(self.image, ns=(0, 0))
+        self.assertEqual(self.build(), {"index.md"})
+
+        self.write("content/other.md", "# Other")
+        self.assertEqual(self.build(), {"index.md", "other.md"})
+
+
+if __name__ == "__main__":
+    unittest.main()
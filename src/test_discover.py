@@ -0,0 +1,55 @@
+import os
+import unittest
+
+from discover import CONTENT_IGNORE, STATIC_IGNORE, scan
+from fixtures import TempDirTestCase
+
+
+class TestScan(TempDirTestCase):
+    def test_sorted_with_metadata(self):
+        self.write("index.md", "# Home")
+        self.write("blog/post/index.md")
+        self.write("blog/a.md")
+        self.write("about.md")
+        entries = scan(self.root)
+        self.assertEqual([entry.rel_path for entry in entries],
+                         ["about.md", "blog/a.md", "blog/post/index.md", "index.md"])
+        home = entries[-1]
+        self.assertEqual(home.path, os.path.join(self.root, "index.md"))
+        self.assertEqual(home.size, 6)
+        self.assertEqual(home.mtime_ns, os.stat(home.path).st_mtime_ns)
+
+    def test_ignore_patterns(self):
+        self.write("index.md")
+        self.write(".gitkeep")
+        self.write(".git/config")
+        self.write("blog/.index.md.swp")
+        self.write("blog/index.md~")
+        self.write("blog/_unfinished.md")
+        self.write("blog/idea.draft.md")
+        self.write("blog/post.md")
+        skipped = []
+        self.assertEqual([entry.rel_path for entry in scan(self.root, CONTENT_IGNORE, ".md",
+                                                           skipped)],
+                         ["blog/post.md", "index.md"])
+        self.assertEqual(sorted(skipped), [".git", "blog/_unfinished.md", "blog/idea.draft.md"])
+        self.assertIn("blog/_unfinished.md",
+                      [entry.rel_path for entry in scan(self.root)])
+
+    def test_static_files_keep_published_dotfiles(self):
+        self.write("index.css")
+        self.write(".nojekyll")
+        self.write(".well-known/security.txt")
+        self.write(".gitkeep")
+        self.write(".git/config")
+        self.write(".DS_Store")
+        self.write("index.css~")
+        self.assertEqual([entry.rel_path for entry in scan(self.root, STATIC_IGNORE)],
+                         [".nojekyll", ".well-known/security.txt", "index.css"])
+
+    def test_missing_root(self):
+        self.assertEqual(scan(os.path.join(self.root, "missing")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import unittest
+
+from copystatic import sync_static
+from fingerprint import AssetManifest, fingerprinted_path
+from fixtures import TempDirTestCase
+from gencontent import BuildContext, generate_pages_recursive
+from htmlnode import LeafNode, ParentNode
+from manifest import Manifest, hash_bytes
+from markdown_blocks import markdown_to_html_node
+from template import Template
+
+CSS = 'body { background: url("images/bg.png"); } h1 { background: url(//cdn/x.png) }'
+
+
+class TestAssetManifest(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.assets = AssetManifest({"/index.css": "/index.3f9a1c2b.css",
+                                     "/images/bg.png": "/images/bg.0a1b2c3d.png"})
+
+    def test_fingerprinted_path(self):
+        self.assertEqual(fingerprinted_path(os.path.join("images", "bg.png"), "0a1b2c3d4e5f"),
+                         os.path.join("images", "bg.0a1b2c3d.png"))
+
+    def test_url_keeps_query_and_fragment(self):
+        self.assertEqual(self.assets.url("/index.css?v=1#top"), "/index.3f9a1c2b.css?v=1#top")
+        self.assertEqual(self.assets.url("/blog/tom"), "/blog/tom")
+        self.assertEqual(self.assets.url("https://example.com/index.css"),
+                         "https://example.com/index.css")
+
+    def test_transform_rewrites_image_and_link_nodes(self):
+        image = LeafNode("img", "", {"src": "/images/bg.png", "alt": "bg"})
+        link = LeafNode("a", "style", {"href": "/index.css"})
+        page = LeafNode("a", "Tom", {"href": "/blog/tom"})
+        node = ParentNode("div", [ParentNode("p", [image, link, page])])
+        self.assertEqual(self.assets.transform(node), 2)
+        self.assertEqual(node.to_html(),
+                         '<div><p><img src="/images/bg.0a1b2c3d.png" alt="bg"></img>'
+                         '<a href="/index.3f9a1c2b.css">style</a>'
+                         '<a href="/blog/tom">Tom</a></p></div>')
+        self.assertEqual(image.props["src"], "/images/bg.png")
+
+    def test_transform_rewrites_links_around_formatted_text(self):
+        markdown = "[_bg_](/images/bg.png)"
+        node = markdown_to_html_node(markdown)
+        self.assertEqual(self.assets.transform(node), 1)
+        self.assertEqual(node.to_html(),
+                         '<div><p><a href="/images/bg.0a1b2c3d.png"><i>bg</i></a></p></div>')
+        self.assertEqual(markdown_to_html_node(markdown).to_html(),
+                         '<div><p><a href="/images/bg.png"><i>bg</i></a></p></div>')
+
+    def test_rewrite_css(self):
+        self.assertEqual(self.assets.rewrite_css(CSS, "/index.css"),
+                         'body { background: url("/images/bg.0a1b2c3d.png"); } '
+                         'h1 { background: url(//cdn/x.png) }')
+
+    def test_template_references_are_rewritten(self):
+        path = self.write("template.html", '<link href="/index.css" rel="stylesheet">{{ Content }}')
+        plain = Template(path, "/ssg/")
+        template = Template(path, "/ssg/", self.assets)
+        self.assertEqual(template.render(Content=""),
+                         '<link href="/ssg/index.3f9a1c2b.css" rel="stylesheet">')
+        self.assertNotEqual(template.digest, plain.digest)
+
+
+class TestFingerprintedBuild(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "public")
+        self.template = os.path.join(self.root, "template.html")
+        self.write("template.html", '<link href="/index.css">{{ Content }}')
+        self.write("static/index.css", CSS)
+        self.write("static/images/bg.png", "bg")
+        self.write("static/robots.txt")
+        self.write("content/index.md", "# Home\n\n![bg](/images/bg.png)")
+        self.write("content/tom.md", "# Tom")
+
+    def build(self):
+        manifest = Manifest.load(os.path.join(self.root, "manifest.json"))
+        assets = AssetManifest()
+        sync_static(self.static, self.public, manifest, assets=assets)
+        generate_pages_recursive(self.content, self.public,
+                                 BuildContext(self.template, assets=assets), manifest)
+        manifest.prune(self.public)
+        manifest.save()
+        return assets
+
+    def test_assets_are_renamed_and_referenced(self):
+        assets = self.build()
+        bg = f"/images/bg.{hash_bytes(b'bg')[:8]}.png"
+        self.assertEqual(assets.urls["/images/bg.png"], bg)
+        self.assertNotIn("/robots.txt", assets.urls)
+        self.assertTrue(os.path.exists(os.path.join(self.public, "robots.txt")))
+
+        with open(os.path.join(self.public, assets.urls["/index.css"].lstrip("/"))) as f:
+            self.assertIn(f'url("{bg}")', f.read())
+        with open(os.path.join(self.public, "index.html")) as f:
+            html = f.read()
+        self.assertIn(f'<link href="{assets.urls["/index.css"]}">', html)
+        self.assertIn(f'<img src="{bg}"', html)
+
+    def test_changed_asset_rebuilds_its_pages(self):
+        old = self.build()
+        tom = os.path.join(self.public, "tom.html")
+        mtime = os.stat(tom).st_mtime_ns
+        self.write("static/images/bg.png", "new bg")
+        new = self.build()
+
+        self.assertNotEqual(new.urls["/images/bg.png"], old.urls["/images/bg.png"])
+        self.assertFalse(os.path.exists(
+            os.path.join(self.public, old.urls["/images/bg.png"].lstrip("/"))))
+        with open(os.path.join(self.public, "index.html")) as f:
+            self.assertIn(new.urls["/images/bg.png"], f.read())
+        # The stylesheet points at the image, so its name changes too and
+        # every page using the template is rebuilt.
+        self.assertNotEqual(new.urls["/index.css"], old.urls["/index.css"])
+        self.assertNotEqual(os.stat(tom).st_mtime_ns, mtime)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import unittest
+
+from fixtures import TempDirTestCase
+from fsutil import atomic_replace, atomic_write, write_fragments_if_changed, write_if_changed
+
+
+class TestFsUtil(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.root, "index.html")
+
+    def test_write_if_changed_skips_identical_content(self):
+        self.assertTrue(write_if_changed(self.path, "<p>one</p>"))
+        os.utime(self.path, ns=(0, 0))
+        self.assertFalse(write_if_changed(self.path, "<p>one</p>"))
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 0)
+
+        self.assertTrue(write_if_changed(self.path, "<p>two</p>"))
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "<p>two</p>")
+
+    def test_write_fragments_if_changed(self):
+        self.assertEqual(write_fragments_if_changed(self.path, ["<p>", "caf\u00e9", "</p>"]),
+                         (True, 12))
+        os.utime(self.path, ns=(0, 0))
+        self.assertEqual(write_fragments_if_changed(self.path, iter(["<p>caf\u00e9", "</p>"])),
+                         (False, 12))
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 0)
+
+        for fragments in (["<p>caf\u00e9</p>", "<p>more</p>"], ["<p>caf\u00e9"],
+                          ["<p>", "tea", "</p>"]):
+            changed, size = write_fragments_if_changed(self.path, fragments)
+            with open(self.path, encoding="utf-8") as f:
+                self.assertEqual(f.read(), "".join(fragments))
+            self.assertEqual((changed, size), (True, os.path.getsize(self.path)))
+        self.assertEqual(os.listdir(self.root), ["index.html"])
+
+    def test_atomic_write_replaces_inode(self):
+        atomic_write(self.path, "old")
+        with open(self.path) as reader:
+            atomic_write(self.path, "new")
+            self.assertEqual(reader.read(), "old")
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "new")
+
+    def test_failed_write_leaves_original(self):
+        atomic_write(self.path, "old")
+        with self.assertRaises(RuntimeError):
+            with atomic_replace(self.path) as tmp_path:
+                with open(tmp_path, "w") as f:
+                    f.write("partial")
+                raise RuntimeError("boom")
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "old")
+        self.assertEqual(os.listdir(self.root), ["index.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
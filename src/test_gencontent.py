@@ -1,6 +1,10 @@
+import os
 import unittest
 
-from gencontent import extract_title
+from fixtures import TempDirTestCase
+from gencontent import (BuildContext, SourceLines, collect_pages, extract_title,
+                        generate_pages)
+from rendercache import RenderCache
 
 
 class TestExtractTitle(unittest.TestCase):
@@ -46,5 +50,69 @@ no title
             pass
 
 
+class TestGeneratePages(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "public")
+        self.template = os.path.join(self.root, "template.html")
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+
+    def test_collect_pages(self):
+        self.write("content/index.md", "# Home")
+        self.write("content/blog/post/index.md", "# Post")
+        self.write("content/blog/notes.txt", "not markdown")
+        pages = collect_pages(self.content, self.public)
+        self.assertEqual(
+            [(os.path.relpath(src, self.content), os.path.relpath(dest, self.public))
+             for src, dest in pages],
+            [
+                ("blog/post/index.md", "blog/post/index.html"),
+                ("index.md", "index.html"),
+            ],
+        )
+
+    def test_failures_do_not_stop_other_pages(self):
+        self.write("content/a/index.md", "no title here")
+        self.write("content/b/index.md", "# Fine")
+        pages = collect_pages(self.content, self.public)
+        for workers in (1, 2):
+            failures = generate_pages(pages, BuildContext(self.template, workers=workers))
+            self.assertEqual([src for src, _ in failures], [pages[0][0]])
+            self.assertIsInstance(failures[0][1], ValueError)
+            self.assertTrue(os.path.exists(pages[1][1]))
+
+    def test_render_cache_reused_across_basepaths(self):
+        self.write("content/index.md", "# Home\n\n[link](/about)")
+        pages = collect_pages(self.content, self.public)
+        cache = RenderCache(os.path.join(self.root, "cache"))
+        generate_pages(pages, BuildContext(self.template, cache=cache))
+
+        key = cache.key("# Home\n\n[link](/about)")
+        cache.put(key, '<div><p><a href="/cached">link</a></p></div>')
+        context = BuildContext(self.template, "/base/", cache=cache)
+        self.assertEqual(generate_pages(pages, context), [])
+        with open(pages[0][1]) as f:
+            self.assertIn('<a href="/base/cached">', f.read())
+
+    def test_streamed_pages_match_cached_pages(self):
+        markdown = "Intro\n\n# Bree\n\n```\n# not a title\n\ncode\n```\n\n- a\n- b\n"
+        self.write("content/index.md", markdown)
+        pages = collect_pages(self.content, self.public)
+        generate_pages(pages, BuildContext(self.template))
+        with open(pages[0][1]) as f:
+            streamed = f.read()
+        cache = RenderCache(os.path.join(self.root, "cache"))
+        generate_pages(pages, BuildContext(self.template, cache=cache))
+        with open(pages[0][1]) as f:
+            self.assertEqual(f.read(), streamed)
+        self.assertTrue(streamed.startswith("<title>Bree</title>"))
+
+        with open(pages[0][0]) as f:
+            source = SourceLines(f)
+            self.assertEqual("".join(source), markdown)
+        self.assertEqual((source.title, source.size), ("Bree", len(markdown)))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,6 @@
+import sys
 import unittest
-from htmlnode import LeafNode, ParentNode, HTMLNode
+from htmlnode import LeafNode, ParentNode, HTMLNode, replace_nodes
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -108,6 +109,50 @@ class TestHTMLNode(unittest.TestCase):
             "<h2><b>Bold text</b>Normal text<i>italic text</i>Normal text</h2>",
         )
 
+    def test_iter_html_matches_to_html(self):
+        node = ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode("b", "Bold"), LeafNode(None, " text")]),
+                LeafNode("a", "link", {"href": "/x"}),
+            ],
+            {"class": "c"},
+        )
+        self.assertEqual(
+            list(node.iter_html()),
+            ['<div class="c">', "<p>", "<b>Bold</b>", " text", "</p>",
+             '<a href="/x">link</a>', "</div>"],
+        )
+        self.assertEqual("".join(node.iter_html()), node.to_html())
+
+    def test_deep_nesting(self):
+        depth = sys.getrecursionlimit() * 2
+        node = LeafNode(None, "x")
+        for _ in range(depth):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertEqual(len(html), len("<span></span>") * depth + 1)
+
+    def test_nodes_have_no_instance_dict(self):
+        for node in (HTMLNode("p"), LeafNode("b", "x"), ParentNode("p", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_parent_without_children(self):
+        node = ParentNode("div", [ParentNode("p", None)])
+        with self.assertRaises(ValueError):
+            node.to_html()
+
+
+    def test_replace_nodes_copies_parents(self):
+        shared = ParentNode("b", [LeafNode(None, "x"), LeafNode("i", "y")])
+        node = ParentNode("div", [ParentNode("p", [shared])])
+
+        def upper(child):
+            if child.tag == "i":
+                return LeafNode("i", child.value.upper())
+        self.assertEqual(replace_nodes(node, upper), 1)
+        self.assertEqual(node.to_html(), "<div><p><b>x<i>Y</i></b></p></div>")
+        self.assertEqual(shared.to_html(), "<b>x<i>y</i></b>")
 
 if __name__ == "__main__":
     unittest.main()
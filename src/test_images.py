@@ -0,0 +1,113 @@
+import os
+import struct
+import unittest
+
+from fixtures import TempDirTestCase
+from gencontent import BuildContext, generate_pages
+from htmlnode import LeafNode, ParentNode
+from images import Image, ImagePipeline, image_size, variant_path
+from instrument import BuildReport
+from manifest import Manifest
+from markdown_blocks import markdown_to_html_node
+
+
+def png(width, height):
+    return (b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR"
+            + struct.pack(">II", width, height) + b"\x08\x06\x00\x00\x00")
+
+
+def gif(width, height):
+    return b"GIF89a" + struct.pack("<HH", width, height) + b"\x00\x00\x00"
+
+
+def jpeg(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    sof = b"\xff\xc0" + struct.pack(">HBHH", 11, 8, height, width) + b"\x01\x01\x11\x00"
+    return b"\xff\xd8" + app0 + sof + b"\xff\xd9"
+
+
+class TestImages(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.public = os.path.join(self.root, "public")
+
+    def test_image_size(self):
+        self.assertEqual(image_size(self.write("public/a.png", png(1026, 388))), (1026, 388))
+        self.assertEqual(image_size(self.write("public/a.gif", gif(32, 16))), (32, 16))
+        self.assertEqual(image_size(self.write("public/a.jpg", jpeg(640, 480))), (640, 480))
+        self.assertIsNone(image_size(self.write("public/a.txt", b"not an image")))
+
+    def test_variant_path(self):
+        self.assertEqual(variant_path("/images/a.png", 480), "/images/a-480w.png")
+
+    def test_transform_replaces_shared_nodes(self):
+        self.write("public/images/a.png", png(1000, 500))
+        shared = LeafNode("img", "", {"src": "/images/a.png", "alt": "a"})
+        remote = LeafNode("img", "", {"src": "https://example.com/b.png", "alt": "b"})
+        node = ParentNode("div", [ParentNode("p", [shared, remote])])
+
+        pipeline = ImagePipeline(self.public, os.path.join(self.root, "cache"))
+        self.assertEqual(pipeline.transform(node), 1)
+        self.assertEqual(shared.props, {"src": "/images/a.png", "alt": "a"})
+        self.assertEqual(
+            node.to_html(),
+            '<div><p><img src="/images/a.png" alt="a" width="1000" height="500"'
+            ' loading="lazy"></img><img src="https://example.com/b.png" alt="b"></img></p></div>',
+        )
+
+    def test_sizing_is_timed_as_its_own_stage(self):
+        self.write("public/images/a.png", png(10, 5))
+        template = self.write("template.html", "{{ Content }}")
+        source = self.write("content/index.md", "# A\n\n![a](/images/a.png)")
+        pipeline = ImagePipeline(self.public, os.path.join(self.root, "cache"))
+        report = BuildReport()
+        generate_pages([(source, os.path.join(self.public, "index.html"))],
+                       BuildContext(template, images=pipeline), report)
+        self.assertEqual([stage for stage, _ in report.pages[0]["stages"]],
+                         ["blocks", "inline", "images", "to_html", "template", "write"])
+
+    def test_transform_leaves_cached_inline_nodes_alone(self):
+        self.write("public/images/a.png", png(1000, 500))
+        pipeline = ImagePipeline(self.public, os.path.join(self.root, "cache"))
+        markdown = "**x ![a](/images/a.png)**"
+        node = markdown_to_html_node(markdown)
+        self.assertEqual(pipeline.transform(node), 1)
+        self.assertIn('width="1000" height="500"', node.to_html())
+        self.assertEqual(markdown_to_html_node(markdown).to_html(),
+                         '<div><p><b>x <img src="/images/a.png" alt="a"></img></b></p></div>')
+
+    def test_srcset_lists_smaller_variants(self):
+        self.write("public/images/a.png", png(1000, 500))
+        pipeline = ImagePipeline(self.public, os.path.join(self.root, "cache"))
+        pipeline.widths = (480, 960, 1200)
+        self.assertEqual(
+            pipeline.attributes("/images/a.png")["srcset"],
+            "/images/a-480w.png 480w, /images/a-960w.png 960w, /images/a.png 1000w",
+        )
+
+    def test_signature_follows_image_changes(self):
+        self.write("public/a.png", png(100, 50))
+        pipeline = ImagePipeline(self.public, os.path.join(self.root, "cache"))
+        before = pipeline.signature("![a](/a.png)")
+        path = self.write("public/a.png", png(200, 100))
+        os.utime(path, ns=(1, 1))
+        self.assertNotEqual(pipeline.signature("![a](/a.png)"), before)
+
+    @unittest.skipIf(Image is None, "Pillow is not installed")
+    def test_variants_are_cached_by_hash(self):
+        source = os.path.join(self.root, "static", "a.png")
+        os.makedirs(os.path.dirname(source))
+        Image.new("RGB", (100, 40)).save(source)
+        dest = os.path.join(self.public, "a.png")
+        pipeline = ImagePipeline(self.public, os.path.join(self.root, "cache"), [50, 200])
+
+        manifest = Manifest(os.path.join(self.root, "manifest.json"))
+        self.assertEqual(pipeline.sync_variants([(source, dest)], manifest), 1)
+        with Image.open(variant_path(dest, 50)) as variant:
+            self.assertEqual(variant.size, (50, 20))
+        cached = pipeline.variant(source, manifest.hash(source), 50)
+        self.assertEqual(os.listdir(os.path.dirname(cached)), [os.path.basename(cached)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -109,6 +109,17 @@ class TestInlineMarkdown(unittest.TestCase):
             matches,
         )
 
+    def test_extract_markdown_links_skips_images(self):
+        matches = extract_markdown_links("![img](/a.png) and [link](/b)")
+        self.assertListEqual([("link", "/b")], matches)
+        self.assertListEqual([], extract_markdown_links("no links here"))
+        self.assertListEqual([], extract_markdown_images("[link](/b) only"))
+
+    def test_delim_absent_keeps_node(self):
+        node = TextNode("plain text", TextType.TEXT)
+        new_nodes = split_nodes_delimiter([node], "**", TextType.BOLD)
+        self.assertIs(new_nodes[0], node)
+
     def test_split_image(self):
         node = TextNode(
             "This is text with an ![image](https://i.imgur.com/zjjcJKZ.png)",
@@ -191,6 +202,47 @@ class TestInlineMarkdown(unittest.TestCase):
             nodes,
         )
 
+    def test_text_to_textnodes_plain_text(self):
+        self.assertListEqual([TextNode("just words!", TextType.TEXT)],
+                             text_to_textnodes("just words!"))
+        self.assertListEqual([], text_to_textnodes(""))
+
+    def test_text_to_textnodes_unclosed_delimiter(self):
+        nodes = text_to_textnodes("2 ** 3 is _eight")
+        self.assertListEqual([TextNode("2 ** 3 is _eight", TextType.TEXT)], nodes)
+
+    def test_text_to_textnodes_code_keeps_delimiters(self):
+        nodes = text_to_textnodes("run `a**b_c` now")
+        self.assertListEqual(
+            [
+                TextNode("run ", TextType.TEXT),
+                TextNode("a**b_c", TextType.CODE),
+                TextNode(" now", TextType.TEXT),
+            ],
+            nodes,
+        )
+
+    def test_text_to_textnodes_link_with_bold_text(self):
+        nodes = text_to_textnodes("see [**docs**](https://a.dev/x_y_z) now")
+        self.assertListEqual(
+            [
+                TextNode("see ", TextType.TEXT),
+                TextNode("**docs**", TextType.LINK, "https://a.dev/x_y_z"),
+                TextNode(" now", TextType.TEXT),
+            ],
+            nodes,
+        )
+
+    def test_text_to_textnodes_broken_image(self):
+        nodes = text_to_textnodes("![alt](missing and [link](https://boot.dev)")
+        self.assertListEqual(
+            [
+                TextNode("![alt](missing and ", TextType.TEXT),
+                TextNode("link", TextType.LINK, "https://boot.dev"),
+            ],
+            nodes,
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,67 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+import instrument
+from instrument import BuildReport, StageTimer, log
+
+
+class TestLog(unittest.TestCase):
+    def tearDown(self):
+        instrument.set_verbosity(instrument.NORMAL)
+
+    def test_levels(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            log("normal")
+            log("verbose", instrument.VERBOSE)
+            instrument.set_verbosity(instrument.QUIET)
+            log("hidden")
+        self.assertEqual(out.getvalue(), "normal\n")
+
+
+class TestBuildReport(unittest.TestCase):
+    def make_page(self, name, stages):
+        timer = StageTimer(name)
+        timer.stages = stages
+        timer.last = timer.start + sum(seconds for _, seconds in stages)
+        timer.bytes_in = 10
+        timer.bytes_out = 20
+        return timer.stats()
+
+    def test_totals_and_slowest(self):
+        report = BuildReport()
+        report.add_page(self.make_page("a.md", [("read", 0.001), ("inline", 0.002)]))
+        report.add_page(self.make_page("b.md", [("read", 0.003), ("inline", 0.004)]))
+        report.add_static(100)
+        report.finish()
+
+        totals = report.stage_totals()
+        self.assertAlmostEqual(totals["read"], 0.004)
+        self.assertAlmostEqual(totals["inline"], 0.006)
+        self.assertEqual(totals["write"], 0.0)
+        self.assertEqual([page["name"] for page in report.slowest(1)], ["b.md"])
+        text = report.format(1)
+        self.assertIn("2, 20 bytes in, 40 bytes out", text)
+        self.assertIn("1 file(s) copied, 100 bytes", text)
+
+    def test_exports(self):
+        report = BuildReport()
+        report.add_page(self.make_page("a.md", [("read", 0.001), ("write", 0.002)]))
+        report.finish()
+        with tempfile.TemporaryDirectory() as tmp:
+            report.write_json(os.path.join(tmp, "report.json"))
+            report.write_chrome_trace(os.path.join(tmp, "trace.json"))
+            with open(os.path.join(tmp, "report.json")) as f:
+                self.assertEqual(len(json.load(f)["pages"]), 1)
+            with open(os.path.join(tmp, "trace.json")) as f:
+                events = json.load(f)["traceEvents"]
+        self.assertEqual([event["name"] for event in events], ["a.md", "read", "write"])
+        self.assertAlmostEqual(events[2]["ts"] - events[1]["ts"], 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
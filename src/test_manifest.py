@@ -0,0 +1,67 @@
+import os
+import unittest
+
+from fixtures import TempDirTestCase
+from manifest import Manifest
+
+
+class TestManifest(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.root, "manifest.json")
+
+    def test_fresh_after_reload(self):
+        out = self.write("out/index.html", "<p>hi</p>")
+        manifest = Manifest(self.path)
+        manifest.record(out, {"hash": "abc"})
+        manifest.save()
+
+        reloaded = Manifest.load(self.path)
+        self.assertTrue(reloaded.is_fresh(out, {"hash": "abc"}))
+        self.assertFalse(reloaded.is_fresh(out, {"hash": "def"}))
+
+    def test_missing_output_is_stale(self):
+        manifest = Manifest(self.path, {"gone.html": {"hash": "abc"}})
+        self.assertFalse(manifest.is_fresh("gone.html", {"hash": "abc"}))
+
+    def test_current_ignores_force(self):
+        out = self.write("a.css", "body {}")
+        manifest = Manifest(self.path, {out: {"hash": "abc"}})
+        manifest.force = True
+        self.assertFalse(manifest.is_fresh(out, {"hash": "abc"}))
+        self.assertTrue(manifest.is_current(out, {"hash": "abc"}))
+        self.assertFalse(manifest.is_current(out, {"hash": "def"}))
+
+    def test_hash_changes_with_content(self):
+        src = self.write("a.md", "# one")
+        before = Manifest(self.path).hash(src)
+        self.write("a.md", "# two")
+        self.assertNotEqual(before, Manifest(self.path).hash(src))
+
+    def test_prune_removes_outputs_without_sources(self):
+        kept = self.write("out/keep.html", "keep")
+        gone = self.write("out/old/gone.html", "gone")
+        manifest = Manifest(self.path, {kept: {}, gone: {}})
+        manifest.record(kept, {})
+
+        removed = manifest.prune(os.path.join(self.root, "out"))
+        self.assertEqual(removed, [gone])
+        self.assertTrue(os.path.exists(kept))
+        self.assertFalse(os.path.exists(os.path.dirname(gone)))
+
+    def test_sweep_removes_unrecorded_files(self):
+        kept = self.write("out/keep.html", "keep")
+        stray = self.write("out/old/stray.html", "stray")
+        git = self.write("out/.git/HEAD", "ref")
+        manifest = Manifest(self.path)
+        manifest.record(kept, {})
+
+        removed = manifest.sweep(os.path.join(self.root, "out"), (".git",))
+        self.assertEqual(removed, [stray])
+        self.assertTrue(os.path.exists(kept))
+        self.assertTrue(os.path.exists(git))
+        self.assertFalse(os.path.exists(os.path.dirname(stray)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,19 @@
+import io
 import unittest
 from markdown_blocks import (
     markdown_to_html_node,
     markdown_to_blocks,
     block_to_block_type,
+    parse_blocks,
+    text_to_children,
+    configure_inline_cache,
+    heading_to_html_node,
+    olist_to_html_node,
+    quote_to_html_node,
     BlockType,
+    InlineCache,
 )
+import markdown_blocks
 
 
 class TestMarkdownToHTML(unittest.TestCase):
@@ -163,6 +172,90 @@ the **same** even with inline stuff
             "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
         )
 
+    def test_nested_inline(self):
+        md = "Read [the **full** guide](/guide) and **bold _italic_ text**"
+
+        node = markdown_to_html_node(md)
+        html = node.to_html()
+        self.assertEqual(
+            html,
+            '<div><p>Read <a href="/guide">the <b>full</b> guide</a> and <b>bold <i>italic</i> text</b></p></div>',
+        )
+
+    def test_parse_blocks_line_ranges(self):
+        md = io.StringIO("# title\n\nsome text\nmore text\n\n- a\n- b\n")
+        blocks = [
+            (block.block_type, block.start, block.end) for block in parse_blocks(md)
+        ]
+        self.assertEqual(
+            blocks,
+            [
+                (BlockType.HEADING, 1, 1),
+                (BlockType.PARAGRAPH, 3, 4),
+                (BlockType.ULIST, 6, 7),
+            ],
+        )
+
+    def test_codeblock_with_blank_lines(self):
+        md = """
+```python
+def f():
+
+    return 1
+```
+
+after
+"""
+
+        node = markdown_to_html_node(md)
+        html = node.to_html()
+        self.assertEqual(
+            html,
+            "<div><pre><code>def f():\n\n    return 1\n</code></pre><p>after</p></div>",
+        )
+
+    def test_unclosed_codeblock(self):
+        md = "```\ncode\n\nstill code"
+        blocks = list(parse_blocks(md.split("\n")))
+        self.assertEqual(len(blocks), 1)
+        self.assertEqual(blocks[0].block_type, BlockType.CODE)
+        self.assertEqual(blocks[0].text, md)
+
+    def test_block_builders_accept_text(self):
+        self.assertEqual(heading_to_html_node("## Bree").to_html(), "<h2>Bree</h2>")
+        self.assertEqual(heading_to_html_node(["## Bree"]).to_html(), "<h2>Bree</h2>")
+        self.assertEqual(olist_to_html_node("1. a\n2. b").to_html(),
+                         "<ol><li>a</li><li>b</li></ol>")
+        self.assertEqual(quote_to_html_node("> a\n> b").to_html(),
+                         "<blockquote>a b</blockquote>")
+
+
+class TestInlineCache(unittest.TestCase):
+    def tearDown(self):
+        configure_inline_cache(4096)
+
+    def test_repeated_text_is_reused(self):
+        configure_inline_cache(10)
+        first = text_to_children("see [home](/) for **more**")
+        second = text_to_children("see [home](/) for **more**")
+        self.assertIsNot(first, second)
+        self.assertIs(first[1], second[1])
+        cache = markdown_blocks.inline_cache
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_lru_eviction(self):
+        cache = InlineCache(2)
+        cache.put("a", ())
+        cache.put("b", ())
+        cache.get("a")
+        cache.put("c", ())
+        self.assertEqual(list(cache.entries), ["a", "c"])
+
+    def test_disabled(self):
+        configure_inline_cache(0)
+        text_to_children("plain")
+        self.assertEqual(len(markdown_blocks.inline_cache.entries), 0)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from pathlib import Path
+
+from fixtures import TempDirTestCase
+from gencontent import BuildContext, generate_pages
+from minify import minify_html
+
+
+def minified(*fragments):
+    return "".join(minify_html(fragments))
+
+
+class TestMinify(unittest.TestCase):
+    def test_whitespace_around_block_tags_is_dropped(self):
+        html = "<!DOCTYPE html>\n<html>\n\n<head>\n    <title> Tolkien </title>\n</head>\n"
+        self.assertEqual(minified(html), "<!DOCTYPE html><html><head><title>Tolkien</title></head>")
+
+    def test_whitespace_around_inline_tags_is_collapsed(self):
+        self.assertEqual(minified("<p>Here's   the\n deal, <b>I like</b>  <i>Tolkien</i> .</p>"),
+                         "<p>Here's the deal, <b>I like</b> <i>Tolkien</i> .</p>")
+
+    def test_code_blocks_are_preserved(self):
+        code = "<pre><code>func main(){\n    fmt.Println(\"Aiya,  Ambar!\")\n}\n</code></pre>"
+        self.assertEqual(minified("<div>\n  ", code, "\n</div>"), f"<div>{code}</div>")
+
+    def test_preserved_text_spans_fragments(self):
+        fragments = ["<article>\n<textarea>  a\n", "  b  </text", "area>\n  <p> c </p>"]
+        self.assertEqual(minified(*fragments), "<article><textarea>  a\n  b  </textarea><p>c</p>")
+        self.assertEqual(minified("<script>if (a  <b) {}</script>"),
+                         "<script>if (a  <b) {}</script>")
+
+    def test_whitespace_is_resolved_across_fragments(self):
+        self.assertEqual(minified("<article>\n   ", "Rivendell", "   \n</article>"),
+                         "<article>Rivendell</article>")
+        self.assertEqual(minified("<p>a  ", "  ", " <b>b</b></p>"), "<p>a <b>b</b></p>")
+
+    def test_unclosed_preserved_text_is_flushed(self):
+        self.assertEqual(minified("<pre>x\n  y", " z"), "<pre>x\n  y z")
+        self.assertEqual(minified("<p>a</p>\n<script>var x = 1;"), "<p>a</p><script>var x = 1;")
+        self.assertEqual(minified("<pre>x  ", "\n  "), "<pre>x  \n  ")
+
+    def test_trailing_whitespace_is_dropped(self):
+        self.assertEqual(minified("<p>a</p>", "  \n"), "<p>a</p>")
+        self.assertEqual(minified("<p>a</p> b", "   "), "<p>a</p>b")
+
+    def test_no_break_spaces_are_kept(self):
+        html = "<p>\u00a0a\u00a0 \u00a0</p>"
+        self.assertEqual(minified(html), html)
+
+
+class TestMinifiedPages(TempDirTestCase):
+    def test_pages_are_minified(self):
+        template = self.write("template.html",
+                              "<html>\n  <body>\n    {{ Content }}\n  </body>\n</html>\n")
+        source = self.write("page.md", "# Bree\n\n```\nkeep   this\n```")
+        dest = Path(self.root, "out", "page.html")
+        context = BuildContext(template, minify=True)
+        self.assertEqual(generate_pages([(source, dest)], context), [])
+        self.assertEqual(dest.read_text(),
+                         "<html><body><div><h1>Bree</h1>"
+                         "<pre><code>keep   this\n</code></pre></div></body></html>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import unittest
+
+from fixtures import TempDirTestCase
+from gencontent import BuildContext, collect_pages, generate_pages
+from instrument import BuildReport
+
+
+class TestPipeline(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "public")
+        self.template = os.path.join(self.root, "template.html")
+        self.write("template.html",
+                   '<link href="/index.css"><title>{{ Title }}</title>{{ Content }}')
+
+    def read(self, name):
+        with open(os.path.join(self.public, name)) as f:
+            return f.read()
+
+    def test_matches_sequential_build(self):
+        for i in range(6):
+            self.write(f"content/post{i}/index.md", f"# Post {i}\n\n[home](/) and **bold**")
+        pages = collect_pages(self.content, self.public)
+
+        self.assertEqual(generate_pages(pages, BuildContext(self.template, "/base/")), [])
+        expected = [self.read(f"post{i}/index.html") for i in range(6)]
+        report = BuildReport()
+        context = BuildContext(self.template, "/base/", workers=2, pipeline=True)
+        failures = generate_pages(pages, context, report)
+        self.assertEqual(failures, [])
+        self.assertEqual([self.read(f"post{i}/index.html") for i in range(6)], expected)
+        self.assertEqual(len(report.pages), 6)
+        stages = [stage for stage, _ in report.pages[0]["stages"]]
+        self.assertEqual(stages[0], "read")
+        self.assertEqual(stages[-1], "write")
+
+    def test_failures_are_reported_per_page(self):
+        self.write("content/bad/index.md", "no title")
+        self.write("content/good/index.md", "# Good")
+        pages = collect_pages(self.content, self.public)
+        failures = generate_pages(pages, BuildContext(self.template, workers=2, pipeline=True))
+        self.assertEqual([os.path.basename(os.path.dirname(src)) for src, _ in failures],
+                         ["bad"])
+        self.assertIn("<title>Good</title>", self.read("good/index.html"))
+
+
+if __name__ == "__main__":
+    unittest.main()
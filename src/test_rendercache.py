@@ -0,0 +1,39 @@
+import os
+import time
+import unittest
+
+from fixtures import TempDirTestCase
+from rendercache import RenderCache
+
+
+class TestRenderCache(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = RenderCache(self.root, max_bytes=100)
+
+    def test_round_trip(self):
+        key = self.cache.key("# Title")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, "<h1>Title</h1>")
+        self.assertEqual(self.cache.get(key), "<h1>Title</h1>")
+
+    def test_key_depends_on_content(self):
+        self.assertEqual(self.cache.key("a"), self.cache.key("a"))
+        self.assertNotEqual(self.cache.key("a"), self.cache.key("b"))
+
+    def test_evicts_least_recently_used(self):
+        keys = [self.cache.key(str(i)) for i in range(3)]
+        for i, key in enumerate(keys):
+            self.cache.put(key, "x" * 40)
+            stamp = time.time() - 100 + i
+            os.utime(self.cache._path(key), (stamp, stamp))
+        self.cache.get(keys[0])
+
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+
+
+if __name__ == "__main__":
+    unittest.main()
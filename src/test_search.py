@@ -0,0 +1,130 @@
+import gzip
+import json
+import os
+import unittest
+
+from fixtures import TempDirTestCase
+from gencontent import BuildContext, generate_pages_recursive
+from manifest import Manifest
+from markdown_blocks import markdown_to_html_node
+from rendercache import RenderCache
+from search import SearchIndex, extract_terms, page_url, tokenize
+
+
+class TestTerms(unittest.TestCase):
+    def test_tokenize(self):
+        self.assertEqual(tokenize("The Lord of the Rings, 2nd ed."), ["lord", "rings", "2nd", "ed"])
+
+    def test_headings_weigh_more_and_code_blocks_are_skipped(self):
+        node = markdown_to_html_node(
+            "# Rivendell\n\n## Elves of Rivendell\n\nElves **live** here.\n\n```\nelves()\n```"
+        )
+        self.assertEqual(extract_terms(node),
+                         {"rivendell": 12, "elves": 5, "live": 1, "here": 1})
+
+    def test_page_url(self):
+        self.assertEqual(page_url("index.html", "/ssg/"), "/ssg/")
+        self.assertEqual(page_url("blog/tom/index.html", "/"), "/blog/tom/")
+        self.assertEqual(page_url("notes.html", "/"), "/notes.html")
+
+
+class TestSearchIndex(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.out = os.path.join(self.root, "search")
+
+    def read(self, name):
+        with gzip.open(os.path.join(self.out, name)) as f:
+            return json.load(f)
+
+    def test_postings_are_delta_encoded_and_sharded(self):
+        index = SearchIndex(os.path.join(self.root, "search.json"))
+        index.update("a.html", "1", "A", {"elves": 2, "ring": 1})
+        index.update("b.html", "2", "B", {"elves": 1})
+        index.update("c.html", "3", "C", {"elves": 4, "hobbits": 1})
+        index.write(self.out, "/")
+
+        self.assertEqual(self.read("docs.json.gz"), [["/a.html", "A"], ["/b.html", "B"],
+                                                     ["/c.html", "C"]])
+        self.assertEqual(self.read("el.json.gz"), {"elves": [0, 2, 1, 1, 1, 4]})
+        with open(os.path.join(self.out, "index.json")) as f:
+            self.assertEqual(json.load(f)["prefixes"], ["el", "ho", "ri"])
+
+    def test_ids_are_stable_and_unchanged_files_are_kept(self):
+        index = SearchIndex(os.path.join(self.root, "search.json"))
+        index.update("a.html", "1", "A", {"ring": 1})
+        index.update("b.html", "2", "B", {"elves": 1})
+        index.write(self.out, "/")
+        index.save()
+
+        elves = os.path.join(self.out, "el.json.gz")
+        os.utime(elves, ns=(0, 0))
+
+        index = SearchIndex.load(index.path)
+        index.retain(["b.html"])
+        index.update("c.html", "3", "C", {"hobbits": 1})
+        paths = index.write(self.out, "/")
+        self.assertEqual(index.ids, {"b.html": 1, "c.html": 0})
+        self.assertEqual(sorted(os.path.basename(path) for path in paths),
+                         ["docs.json.gz", "el.json.gz", "ho.json.gz", "index.json"])
+        self.assertEqual(os.stat(elves).st_mtime_ns, 0)
+
+    def test_outputs_are_recorded_for_pruning(self):
+        index = SearchIndex(os.path.join(self.root, "search.json"))
+        index.update("a.html", "1", "A", {"ring": 1})
+        manifest = Manifest(os.path.join(self.root, "manifest.json"))
+        for path in index.write(self.out, "/"):
+            manifest.record(path, {"source": index.path})
+        manifest.save()
+
+        index.retain([])
+        index.update("b.html", "2", "B", {"elves": 1})
+        manifest = Manifest.load(manifest.path)
+        for path in index.write(self.out, "/"):
+            manifest.record(path, {"source": index.path})
+        manifest.prune(self.root)
+        manifest.save()
+        self.assertEqual(sorted(os.listdir(self.out)),
+                         ["docs.json.gz", "el.json.gz", "index.json"])
+
+        manifest = Manifest.load(manifest.path)
+        manifest.prune(self.root)
+        self.assertFalse(os.path.exists(self.out))
+
+
+class TestIncrementalSearch(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "public")
+        self.template = os.path.join(self.root, "template.html")
+        self.write("template.html", "{{ Content }}")
+        self.write("content/index.md", "# Home\n\nWelcome")
+        self.write("content/tom.md", "# Tom\n\nBombadil")
+        self.cache = RenderCache(os.path.join(self.root, "cache"))
+
+    def build(self, incremental=True):
+        manifest = Manifest.load(os.path.join(self.root, "manifest.json"))
+        manifest.force = not incremental
+        search = SearchIndex.load(os.path.join(self.root, "search.json"))
+        generate_pages_recursive(self.content, self.public,
+                                 BuildContext(self.template, cache=self.cache), manifest,
+                                 search=search)
+        manifest.save()
+        search.save()
+        return search
+
+    def test_search_documents_follow_builds(self):
+        search = self.build()
+        self.assertEqual(search.docs["tom.html"]["terms"], {"tom": 8, "bombadil": 1})
+
+        os.remove(os.path.join(self.root, "search.json"))
+        search = self.build(incremental=False)
+        self.assertEqual(search.docs["index.html"]["terms"], {"home": 8, "welcome": 1})
+
+        os.remove(os.path.join(self.content, "tom.md"))
+        self.assertEqual(sorted(self.build().docs), ["index.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import argparse
+import filecmp
+import os
+import subprocess
+import sys
+import unittest
+
+from fixtures import TempDirTestCase
+from manifest import Manifest
+from shard import assign_shards, merge_shards, parse_shard, select_shard, shard_paths
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+class TestAssignShards(TempDirTestCase):
+    def pages(self, sizes):
+        pages = []
+        for i, size in enumerate(sizes):
+            path = os.path.join(self.root, f"p{i}.md")
+            with open(path, "w") as f:
+                f.write("x" * size)
+            pages.append((path, f"out/p{i}.html"))
+        return pages
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for value in ("0/4", "5/4", "x"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(value)
+
+    def test_partition_is_complete_and_balanced(self):
+        pages = self.pages([100 * (i % 7 + 1) for i in range(60)])
+        selected = [select_shard(pages, (index, 4)) for index in range(1, 5)]
+        self.assertEqual(sorted(page for shard in selected for page in shard), sorted(pages))
+        loads = [sum(os.path.getsize(path) for path, _ in shard) for shard in selected]
+        self.assertLess(max(loads) - min(loads), sum(loads) / 4 * 0.2)
+
+    def test_assignment_is_stable(self):
+        pages = self.pages([100] * 40)
+        before = assign_shards(pages, 4)
+        self.assertEqual(assign_shards(list(reversed(pages)), 4), before)
+        after = assign_shards(pages[:-1], 4)
+        moved = [path for path in after if after[path] != before[path]]
+        self.assertLess(len(moved), 10)
+
+
+class TestShardedBuild(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write("static/index.css", "body {}")
+        for name in ("index", "a/index", "b/index", "c/index", "d"):
+            self.write(f"content/{name}.md", f"# {name}\n\n[home](/)")
+
+    def run_main(self, *args):
+        return subprocess.Popen([sys.executable, MAIN, "/base/", "-q", "-j", "1", *args],
+                                cwd=self.root)
+
+    def merge(self, count):
+        return merge_shards(os.path.join(self.root, ".ssg-shards"), count,
+                            os.path.join(self.root, "merged"),
+                            os.path.join(self.root, "manifest.json"))
+
+    def test_shards_merge_into_full_site(self):
+        processes = [self.run_main("--shard", f"{index}/3") for index in (1, 2, 3)]
+        self.assertEqual([process.wait() for process in processes], [0, 0, 0])
+        self.assertEqual(self.merge(3), [])
+
+        self.assertEqual(self.run_main().wait(), 0)
+        full = os.path.join(self.root, "docs")
+        files = sorted(os.path.relpath(os.path.join(dir_path, name), full)
+                       for dir_path, _, names in os.walk(full) for name in names)
+        self.assertEqual(len(files), 6)
+        match, mismatch, errors = filecmp.cmpfiles(full, os.path.join(self.root, "merged"),
+                                                   files, shallow=False)
+        self.assertEqual((mismatch, errors), ([], []))
+
+    def test_merge_reports_missing_and_duplicate_pages(self):
+        processes = [self.run_main("--shard", f"{index}/2") for index in (1, 2)]
+        self.assertEqual([process.wait() for process in processes], [0, 0])
+        shard_root = os.path.join(self.root, ".ssg-shards")
+        self.assertIn(f"shard 3/3: no manifest at {shard_paths(shard_root, (3, 3))[1]}",
+                      self.merge(3))
+
+        first_dir, first_path = shard_paths(shard_root, (1, 2))
+        second = Manifest.load(shard_paths(shard_root, (2, 2))[1])
+        first = Manifest.load(first_path)
+        taken, missing = first.info["shard"]["pages"][:2]
+        second.outputs = dict(second.previous)
+        second.outputs[os.path.join(second.info["shard"]["root"], taken)] = {}
+        second.info["shard"]["pages"].append(taken)
+        second.save()
+        os.remove(os.path.join(first_dir, missing))
+
+        self.assertEqual(self.merge(2), [f"{taken}: rendered by shards 1 and 2",
+                                         f"{missing}: missing from shard 1"])
+        self.assertFalse(os.path.exists(os.path.join(self.root, "merged")))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import unittest
+from xml.etree import ElementTree
+
+from fixtures import TempDirTestCase
+from gencontent import BuildContext, generate_pages_recursive
+from manifest import Manifest
+from sitemap import ATOM_NS, SITEMAP_NS, Sitemap
+
+SITE_URL = "https://example.org"
+
+
+class TestSitemap(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "public")
+        self.template = os.path.join(self.root, "template.html")
+        self.write("template.html", "{{ Content }}")
+        self.write("content/index.md", "# Tolkien Fan Club", 1000)
+        self.write("content/blog/tom/index.md", "# Why Tom Bombadil Was a Mistake", 2000)
+        self.write("content/blog/majesty/index.md",
+                   '# The Majesty of "The Lord of the Rings"', 3000)
+
+    def build(self):
+        manifest = Manifest.load(os.path.join(self.root, "manifest.json"))
+        sitemap = Sitemap.load(os.path.join(self.root, "sitemap.json"))
+        generate_pages_recursive(self.content, self.public, BuildContext(self.template, "/ssg/"),
+                                 manifest, sitemap=sitemap)
+        manifest.save()
+        sitemap.save()
+        sitemap.write(self.public, "/ssg/", SITE_URL)
+        return sitemap
+
+    def read(self, name):
+        return ElementTree.parse(os.path.join(self.public, name)).getroot()
+
+    def test_sitemap_lists_pages_with_lastmod(self):
+        self.build()
+        urls = {url.findtext(f"{{{SITEMAP_NS}}}loc"): url.findtext(f"{{{SITEMAP_NS}}}lastmod")
+                for url in self.read("sitemap.xml")}
+        self.assertEqual(urls, {
+            "https://example.org/ssg/": "1970-01-01T00:16:40Z",
+            "https://example.org/ssg/blog/tom/": "1970-01-01T00:33:20Z",
+            "https://example.org/ssg/blog/majesty/": "1970-01-01T00:50:00Z",
+        })
+
+    def test_feed_lists_blog_posts_newest_first(self):
+        self.build()
+        feed = self.read("blog/feed.xml")
+        self.assertEqual(feed.findtext(f"{{{ATOM_NS}}}title"), "Tolkien Fan Club")
+        self.assertEqual(feed.findtext(f"{{{ATOM_NS}}}updated"), "1970-01-01T00:50:00Z")
+        titles = [entry.findtext(f"{{{ATOM_NS}}}title")
+                  for entry in feed.iter(f"{{{ATOM_NS}}}entry")]
+        self.assertEqual(titles, ['The Majesty of "The Lord of the Rings"',
+                                  "Why Tom Bombadil Was a Mistake"])
+
+    def test_lastmod_only_moves_when_content_changes(self):
+        self.build()
+        tom = os.path.join(self.content, "blog", "tom", "index.md")
+        os.utime(tom, (5000, 5000))
+        sitemap = self.build()
+        self.assertEqual(sitemap.pages[os.path.join("blog", "tom", "index.html")]["lastmod"],
+                         "1970-01-01T00:33:20Z")
+
+        self.write("content/blog/tom/index.md", "# Tom Bombadil Was Fine", 6000)
+        sitemap = self.build()
+        page = sitemap.pages[os.path.join("blog", "tom", "index.html")]
+        self.assertEqual((page["title"], page["lastmod"]),
+                         ("Tom Bombadil Was Fine", "1970-01-01T01:40:00Z"))
+
+    def test_removed_pages_are_dropped(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "majesty", "index.md"))
+        sitemap = self.build()
+        self.assertEqual(sorted(sitemap.pages),
+                         [os.path.join("blog", "tom", "index.html"), "index.html"])
+        feed = self.read("blog/feed.xml")
+        self.assertEqual(len(list(feed.iter(f"{{{ATOM_NS}}}entry"))), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
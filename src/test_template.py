@@ -0,0 +1,67 @@
+import os
+import unittest
+
+from fixtures import TempDirTestCase
+from template import Template, load_template, rewrite_root_urls
+
+
+class TestTemplate(TempDirTestCase):
+    def test_render(self):
+        path = self.write("t.html", "<title>{{ Title }}</title><main>{{Content}}</main>")
+        template = Template(path)
+        self.assertEqual(
+            template.render(Title="Hi", Content="<p>body</p>"),
+            "<title>Hi</title><main><p>body</p></main>",
+        )
+
+    def test_basepath_only_rewrites_template(self):
+        path = self.write("t.html", '<link href="/index.css">{{ Content }}')
+        template = Template(path, "/ssg/")
+        self.assertEqual(
+            template.render(Content='<a href="/x">x</a>'),
+            '<link href="/ssg/index.css"><a href="/x">x</a>',
+        )
+
+    def test_partials(self):
+        self.write("head.html", '<img src="/logo.png">{{ Title }}')
+        path = self.write("t.html", "<header>{{> head.html }}</header>{{ Content }}")
+        template = Template(path, "/base/")
+        self.assertEqual(
+            template.render(Title="T", Content="C"),
+            '<header><img src="/base/logo.png">T</header>C',
+        )
+        self.assertEqual(len(template.sources), 2)
+
+    def test_iter_render_streams_fragments(self):
+        path = self.write("t.html", "<h1>{{ Title }}</h1>{{ Content }}")
+        fragments = Template(path).iter_render(Title="T", Content=iter(["<p>", "a", "</p>"]))
+        self.assertEqual(list(fragments), ["<h1>", "T", "</h1>", "<p>", "a", "</p>"])
+
+    def test_missing_value(self):
+        path = self.write("t.html", "{{ Title }}")
+        with self.assertRaises(ValueError):
+            Template(path).render()
+
+    def test_load_template_is_cached(self):
+        path = self.write("t.html", "{{ Title }}")
+        self.assertIs(load_template(path, "/"), load_template(path, "/"))
+        self.assertIsNot(load_template(path, "/"), load_template(path, "/a/"))
+
+    def test_rewrite_root_urls(self):
+        html = '<a href="/blog">b</a><img src="/i.png" alt=""><a href="https://x">x</a>'
+        self.assertEqual(rewrite_root_urls(html, "/"), html)
+        self.assertEqual(
+            rewrite_root_urls(html, "/ssg/"),
+            '<a href="/ssg/blog">b</a><img src="/ssg/i.png" alt=""><a href="https://x">x</a>',
+        )
+
+    def test_rewrite_srcset(self):
+        html = '<img src="/a.png" srcset="/a-480w.png 480w, https://x/a.png 960w">'
+        self.assertEqual(
+            rewrite_root_urls(html, "/ssg/"),
+            '<img src="/ssg/a.png" srcset="/ssg/a-480w.png 480w, https://x/a.png 960w">',
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+import unittest
+
+import main as site
+from fixtures import TempDirTestCase
+from instrument import NORMAL, QUIET, set_verbosity
+from manifest import Manifest, output_key
+from watch import Rebuilder, WatchedTree
+
+
+class TestWatchedTree(TempDirTestCase):
+    def test_poll_reports_added_edited_and_removed_files(self):
+        kept = self.write("content/a.md", "a")
+        edited = self.write("content/blog/b.md", "b")
+        removed = self.write("content/c.md", "c")
+        template = self.write("template.html", "{{ Content }}")
+        tree = WatchedTree([os.path.join(self.root, "content"), template])
+        self.assertEqual(tree.poll(), [])
+
+        self.write("content/blog/b.md", "changed")
+        os.utime(edited, ns=(0, 0))
+        os.remove(removed)
+        added = self.write("content/blog/new/d.md", "d")
+        self.write("content/.e.md.swp", "")
+        self.write("template.html", "<main>{{ Content }}</main>")
+
+        changed = tree.poll()
+        self.assertEqual(changed, sorted([edited, removed, added, template]))
+        self.assertNotIn(kept, changed)
+        self.assertEqual(tree.poll(), [])
+
+    def test_removed_directory_reports_its_files(self):
+        page = self.write("content/blog/tom/index.md", "# Tom")
+        tree = WatchedTree([os.path.join(self.root, "content")])
+        shutil.rmtree(os.path.join(self.root, "content", "blog"))
+        self.assertEqual(tree.poll(), [page])
+
+    def test_hints_only_list_their_directories(self):
+        content = os.path.join(self.root, "content")
+        page = self.write("content/blog/index.md", "# Blog")
+        other = self.write("content/about/index.md", "# About")
+        tree = WatchedTree([content])
+        self.write("content/blog/index.md", "# Blog posts")
+        self.write("content/about/index.md", "# About us")
+        os.utime(page, ns=(0, 0))
+        os.utime(other, ns=(0, 0))
+
+        hint = os.path.abspath(os.path.join(content, "blog", "index.md"))
+        self.assertEqual(tree.poll([hint]), [page])
+        self.assertEqual(tree.poll(), [other])
+
+
+class TestRebuilder(TempDirTestCase):
+    # The site's paths are relative to the working directory.
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.root)
+        set_verbosity(QUIET)
+        self.addCleanup(set_verbosity, NORMAL)
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write("content/index.md", "# Home\n\n![Tom](/tom.png)")
+        self.write("static/tom.png", b"tom")
+
+    def rebuilder(self, *args):
+        options = site.parse_args([*args, "--incremental"])
+        site.build(options)
+        return Rebuilder(options)
+
+    def test_static_files_use_the_build_settings(self):
+        rebuilder = self.rebuilder("--link", "hardlink", "--static-compare", "hash")
+        source = self.write("static/tom.png", b"bombadil")
+        rebuilder.rebuild([os.path.join(site.dir_path_static, "tom.png")])
+
+        dest = os.path.join(site.dir_path_public, "tom.png")
+        self.assertTrue(os.path.samefile(source, dest))
+        entry = Manifest.load(site.manifest_path).previous[output_key(dest)]
+        self.assertIn("hash", entry)
+
+    def test_fingerprinted_assets_are_renamed_with_their_pages(self):
+        rebuilder = self.rebuilder("--fingerprint")
+        with open("docs/assets.json") as f:
+            old = json.load(f)["/tom.png"]
+        self.write("static/tom.png", b"bombadil")
+        rebuilder.rebuild([os.path.join(site.dir_path_static, "tom.png")])
+
+        with open("docs/assets.json") as f:
+            new = json.load(f)["/tom.png"]
+        self.assertNotEqual(new, old)
+        self.assertFalse(os.path.exists("docs" + old))
+        with open("docs/index.html") as f:
+            self.assertIn(new, f.read())
+        self.assertEqual(rebuilder.assets.urls["/tom.png"], new)
+
+
+if __name__ == "__main__":
+    unittest.main()
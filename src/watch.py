@@ -0,0 +1,557 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import main as site
+from compress import precompress, variant_paths
+from copystatic import copy_file, static_inputs
+from depgraph import DependencyGraph
+from discover import CONTENT_IGNORE, STATIC_IGNORE, ignore_matcher
+from fingerprint import AssetManifest
+from gencontent import (BuildContext, collect_pages, generate_page, page_dest_path,
+                        page_inputs, site_index_path)
+from instrument import VERBOSE, log, log_error, set_verbosity
+from markdown_blocks import configure_inline_cache
+from manifest import Manifest, output_key, remove_empty_parents
+from search import SearchIndex
+from sitemap import Sitemap
+from template import load_template
+
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+RELOAD_PATH = "/__livereload"
+RELOAD_SCRIPT = (
+    f'<script>new EventSource("{RELOAD_PATH}")'
+    ".onmessage = function () { location.reload(); };</script>"
+)
+# Idle polls back off to this many seconds between scans. It stays under
+# the tenth of a second a save should take to show up in the browser.
+MAX_POLL_INTERVAL = 0.08
+
+
+class WatchedTree:
+    # The stamps of every watched file, grouped by directory, so a change is
+    # found by listing only the directories it can have touched. Adding,
+    # removing or renaming an entry moves its directory's mtime; edits in
+    # place are caught by the stat of the file itself. It skips what static
+    # files skip, so published dotfiles are watched; ignored pages are
+    # filtered out when they are rebuilt.
+    def __init__(self, paths, ignore=STATIC_IGNORE):
+        self.is_ignored = ignore_matcher(ignore)
+        self.paths = []
+        self.listings = {}  # dir path -> (rel dir, mtime, {file: stamp}, {subdir: rel dir})
+        self.files = {}     # watched files outside the directories -> stamp
+        self.set_paths(paths)
+
+    def set_paths(self, paths):
+        for path in set(self.paths) - set(paths):
+            self.files.pop(path, None)
+            self._drop(path, [])
+        for path in paths:
+            if path in self.paths:
+                continue
+            if os.path.isdir(path):
+                self._add(path, "", None)
+            else:
+                self.files[path] = _stamp(path)
+        self.paths = list(paths)
+
+    def poll(self, hints=None):
+        # Returns the files added, removed or changed since the last poll.
+        # Without hints every directory is checked; a native watcher passes
+        # the paths named by its events and only their directories are
+        # listed again.
+        changed = []
+        for path in self.paths:
+            if path not in self.files and path not in self.listings and os.path.isdir(path):
+                self._add(path, "", changed)
+        if hints is None:
+            for path in self.files:
+                self._check_file(path, changed)
+            for dir_path in list(self.listings):
+                self._check_dir(dir_path, changed)
+        else:
+            dirs = set()
+            for path in hints:
+                path = self._local(path)
+                if path is None:
+                    continue
+                if path in self.files:
+                    self._check_file(path, changed)
+                    continue
+                if path in self.listings:
+                    dirs.add(path)
+                parent = os.path.dirname(path)
+                while parent and parent not in self.listings and parent != os.path.dirname(parent):
+                    parent = os.path.dirname(parent)
+                if parent in self.listings:
+                    dirs.add(parent)
+            for dir_path in sorted(dirs):
+                self._refresh(dir_path, changed)
+        return sorted(set(changed))
+
+    def _local(self, path):
+        # Event paths may be absolute or resolved; they are mapped onto the
+        # spelling of the watched path they fall under.
+        real = os.path.realpath(path)
+        for root in self.paths:
+            real_root = os.path.realpath(root)
+            if real == real_root:
+                return root
+            if real.startswith(real_root + os.sep):
+                return root + real[len(real_root):]
+        return None
+
+    def _check_file(self, path, changed):
+        stamp = _stamp(path)
+        if stamp != self.files[path]:
+            self.files[path] = stamp
+            changed.append(path)
+
+    def _check_dir(self, dir_path, changed):
+        listing = self.listings.get(dir_path)
+        if listing is None:
+            return
+        try:
+            mtime = os.stat(dir_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != listing[1]:
+            self._refresh(dir_path, changed)
+            return
+        for path, stamp in listing[2].items():
+            if _stamp(path) != stamp:
+                self._refresh(dir_path, changed)
+                return
+
+    def _list(self, dir_path, rel_dir):
+        files = {}
+        subdirs = {}
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                rel_path = rel_dir + entry.name
+                if self.is_ignored(entry.name, rel_path):
+                    continue
+                if entry.is_dir():
+                    subdirs[entry.path] = rel_path + os.sep
+                elif entry.is_file():
+                    stat = entry.stat()
+                    files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return (rel_dir, os.stat(dir_path).st_mtime_ns, files, subdirs)
+
+    def _add(self, dir_path, rel_dir, changed):
+        pending = [(dir_path, rel_dir)]
+        while pending:
+            dir_path, rel_dir = pending.pop()
+            try:
+                listing = self._list(dir_path, rel_dir)
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            self.listings[dir_path] = listing
+            if changed is not None:
+                changed.extend(listing[2])
+            pending.extend(listing[3].items())
+
+    def _drop(self, dir_path, changed):
+        pending = [dir_path]
+        while pending:
+            listing = self.listings.pop(pending.pop(), None)
+            if listing is not None:
+                changed.extend(listing[2])
+                pending.extend(listing[3])
+
+    def _refresh(self, dir_path, changed):
+        old = self.listings.get(dir_path)
+        if old is None:
+            return
+        try:
+            new = self._list(dir_path, old[0])
+        except (FileNotFoundError, NotADirectoryError):
+            self._drop(dir_path, changed)
+            return
+        self.listings[dir_path] = new
+        old_files, new_files = old[2], new[2]
+        changed.extend(path for path, stamp in new_files.items()
+                       if old_files.get(path) != stamp)
+        changed.extend(path for path in old_files if path not in new_files)
+        for subdir in old[3]:
+            if subdir not in new[3]:
+                self._drop(subdir, changed)
+        for subdir, rel_dir in new[3].items():
+            if subdir not in old[3]:
+                self._add(subdir, rel_dir, changed)
+
+
+def _stamp(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class PollingWatcher:
+    # Polls every `interval` seconds while files are changing and backs off
+    # to `max_interval` while nothing does.
+    def __init__(self, tree, interval, max_interval=MAX_POLL_INTERVAL):
+        self.tree = tree
+        self.interval = interval
+        self.max_interval = max(interval, max_interval)
+
+    def set_paths(self, paths):
+        self.tree.set_paths(paths)
+
+    def changes(self):
+        delay = self.interval
+        while True:
+            time.sleep(delay)
+            changed = self.tree.poll()
+            if changed:
+                return changed
+            delay = min(delay * 2, self.max_interval)
+
+    def stop(self):
+        pass
+
+
+class NativeWatcher:
+    # Change notifications from the OS (inotify, FSEvents, ...) through
+    # watchdog. Events only say where to look: the directories they name
+    # are listed again, so the tree stays the single source of changes.
+    def __init__(self, tree, interval):
+        self.tree = tree
+        self.interval = interval
+        self.hints = set()
+        self.condition = threading.Condition()
+        self.observer = Observer()
+        self.watches = {}
+        self.set_paths(tree.paths)
+        self.observer.start()
+
+    def set_paths(self, paths):
+        self.tree.set_paths(paths)
+        wanted = {}
+        for path in paths:
+            if os.path.isdir(path):
+                wanted[path] = True
+            else:
+                wanted.setdefault(os.path.dirname(path) or ".", False)
+        for key in set(self.watches) - set(wanted.items()):
+            self.observer.unschedule(self.watches.pop(key))
+        for path, recursive in wanted.items():
+            if (path, recursive) not in self.watches:
+                self.watches[(path, recursive)] = self.observer.schedule(
+                    self, path, recursive=recursive)
+
+    def dispatch(self, event):
+        if event.event_type in ("opened", "closed_no_write"):
+            return
+        with self.condition:
+            self.hints.add(os.fsdecode(event.src_path))
+            if getattr(event, "dest_path", None):
+                self.hints.add(os.fsdecode(event.dest_path))
+            self.condition.notify()
+
+    def changes(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.hints)
+            # Let a burst of events (a save, a checkout) arrive first.
+            time.sleep(self.interval)
+            with self.condition:
+                hints, self.hints = self.hints, set()
+            changed = self.tree.poll(hints)
+            if changed:
+                return changed
+
+    def stop(self):
+        self.observer.stop()
+        self.observer.join()
+
+
+def make_watcher(paths, interval, poll=False):
+    tree = WatchedTree(paths)
+    if Observer is None or poll:
+        return PollingWatcher(tree, interval)
+    return NativeWatcher(tree, interval)
+
+
+is_ignored_page = ignore_matcher(CONTENT_IGNORE)
+
+
+class Rebuilder:
+    def __init__(self, options):
+        self.options = options
+        self.basepath = options.basepath
+        self.images = site.image_pipeline(options)
+        self.assets = None
+        self.search = None
+        self.sitemap = None
+        self.reload_manifest()
+
+    def reload_manifest(self):
+        self.manifest = Manifest.load(site.manifest_path)
+        self.manifest.outputs = dict(self.manifest.previous)
+        if self.options.search:
+            self.search = SearchIndex.load(site.search_path)
+        if self.options.site_url:
+            self.sitemap = Sitemap.load(site.sitemap_path)
+        if self.options.fingerprint:
+            self.assets = AssetManifest.load(os.path.join(site.dir_path_public, "assets.json"))
+        self.context = BuildContext(site.template_path, self.basepath, images=self.images,
+                                    assets=self.assets, minify=self.options.minify)
+        self.template = load_template(site.template_path, self.basepath, self.assets)
+
+    def watched_paths(self):
+        return [site.dir_path_content, site.dir_path_static, *self.template.sources]
+
+    def rebuild(self, changed):
+        # Every change is first mapped through the dependency graph to the
+        # pages it affects, so each page renders once however many of its
+        # inputs changed.
+        if self.assets is not None and any(_is_under(path, site.dir_path_static)
+                                           for path in changed):
+            # A changed asset gets a new name, which moves the URLs in the
+            # template, stylesheets and pages and leaves the old name to be
+            # pruned: an incremental build does all of that.
+            site.report_failures(site.build(self.options))
+            self.reload_manifest()
+            return
+        try:
+            self.template = load_template(site.template_path, self.basepath, self.assets)
+        except Exception as e:
+            log_error(f" ! {site.template_path}: {e}")
+            return
+        graph = DependencyGraph.from_outputs(self.manifest.outputs)
+        pages = set()
+        written = []
+        for path in changed:
+            self.manifest.invalidate(path)
+            try:
+                if _is_under(path, site.dir_path_content):
+                    pages.update(self.changed_pages(path))
+                elif _is_under(path, site.dir_path_static):
+                    dest_path = self.rebuild_static(path)
+                    written.append(dest_path)
+                    pages.update(self.sources(graph.affected([dest_path], ("assets",))))
+                else:
+                    pages.update(self.sources(graph.affected([path], ("template",))))
+            except Exception as e:
+                log_error(f" ! {path}: {e}")
+
+        for from_path in sorted(pages):
+            try:
+                written.append(self.rebuild_page(from_path))
+            except Exception as e:
+                log_error(f" ! {from_path}: {e}")
+        if self.sitemap is not None and pages:
+            self.sitemap.save()
+            written.extend(site.write_sitemap(self.sitemap, self.manifest,
+                                              site.dir_path_public, self.options))
+        if self.search is not None and pages:
+            self.search.save()
+            written.extend(site.write_search(self.search, self.manifest,
+                                             site.dir_path_public, self.options))
+        if self.options.precompress:
+            precompress(self.manifest, [path for path in written if os.path.exists(path)],
+                        self.options.precompress_min_size)
+        self.manifest.save()
+
+    def changed_pages(self, from_path):
+        rel_path = os.path.relpath(from_path, site.dir_path_content)
+        if is_ignored_page(os.path.basename(from_path), rel_path):
+            return []
+        if not from_path.endswith(".md"):
+            return []
+        dest_path = page_dest_path(from_path, site.dir_path_content, site.dir_path_public)
+        pages = [from_path]
+        # Adding or removing a page changes the site index's page list.
+        added = output_key(dest_path) not in self.manifest.outputs
+        if added or not os.path.exists(from_path):
+            index_path = site_index_path(site.dir_path_content)
+            if os.path.exists(index_path):
+                pages.append(index_path)
+        return pages
+
+    def sources(self, outputs):
+        return [self.manifest.outputs[output]["source"] for output in outputs
+                if output in self.manifest.outputs]
+
+    def rebuild_page(self, from_path):
+        dest_path = page_dest_path(from_path, site.dir_path_content, site.dir_path_public)
+        rel_path = os.path.relpath(dest_path, site.dir_path_public)
+        if not os.path.exists(from_path):
+            self.remove_output(dest_path)
+            if self.search is not None:
+                self.search.remove(rel_path)
+            if self.sitemap is not None:
+                self.sitemap.remove(rel_path)
+            return dest_path
+        site_pages = None
+        if from_path == site_index_path(site.dir_path_content):
+            site_pages = [path for path, _ in
+                          collect_pages(site.dir_path_content, site.dir_path_public)]
+        inputs = page_inputs(self.manifest, from_path, dest_path, self.template,
+                             self.context, site.dir_path_public, site_pages)
+        os.makedirs(dest_path.parent, exist_ok=True)
+        log(f" * {from_path} -> {dest_path}", VERBOSE)
+        stats = generate_page(from_path, dest_path, self.context, self.search is not None)
+        self.manifest.record(dest_path, inputs)
+        if self.search is not None:
+            title, terms = stats["search"]
+            self.search.update(rel_path, inputs["hash"], title, terms)
+        if self.sitemap is not None:
+            self.sitemap.update(rel_path, from_path, inputs["hash"])
+        return dest_path
+
+    def rebuild_static(self, from_path):
+        rel_path = os.path.relpath(from_path, site.dir_path_static)
+        dest_path = os.path.join(site.dir_path_public, rel_path)
+        if not os.path.exists(from_path):
+            self.remove_output(dest_path)
+            return dest_path
+        log(f" * {from_path} -> {dest_path}", VERBOSE)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        copy_file(from_path, dest_path, self.options.link)
+        self.manifest.record(dest_path, static_inputs(self.manifest, from_path,
+                                                      self.options.static_compare))
+        if self.images is not None:
+            self.images.sync_variants([(from_path, dest_path)], self.manifest, self.options.link)
+        return dest_path
+
+    def remove_output(self, dest_path):
+        for path in [dest_path, *variant_paths(dest_path)]:
+            if os.path.isfile(path):
+                log(f" - {path}", VERBOSE)
+                os.remove(path)
+            self.manifest.forget(path)
+        remove_empty_parents(os.path.dirname(dest_path), site.dir_path_public)
+
+
+def _is_under(path, dir_path):
+    return os.path.abspath(path).startswith(os.path.abspath(dir_path) + os.sep)
+
+
+class LiveReload:
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+    def __init__(self, *args, livereload=None, **kwargs):
+        self.livereload = livereload
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.path == RELOAD_PATH:
+            self.stream_reloads()
+            return
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and self.path.endswith("/"):
+            path = os.path.join(path, "index.html")
+        if not path.endswith(".html") or not os.path.isfile(path):
+            super().do_GET()
+            return
+        with open(path, "rb") as f:
+            html = f.read().decode()
+        if "</body>" in html:
+            html = html.replace("</body>", RELOAD_SCRIPT + "</body>", 1)
+        else:
+            html += RELOAD_SCRIPT
+        body = html.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_reloads(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        version = self.livereload.version
+        try:
+            while True:
+                latest = self.livereload.wait(version, 15)
+                if latest != version:
+                    self.wfile.write(b"data: reload\n\n")
+                    version = latest
+                else:
+                    self.wfile.write(b": ping\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def log_message(self, format, *args):
+        if self.path != RELOAD_PATH:
+            super().log_message(format, *args)
+
+
+def serve(directory, port, livereload):
+    handler = partial(DevRequestHandler, directory=directory, livereload=livereload)
+    server = ThreadingHTTPServer(("", port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def watch(options, port, interval, poll=False):
+    site.report_failures(site.build(options))
+    rebuilder = Rebuilder(options)
+    livereload = LiveReload()
+    server = serve(site.dir_path_public, port, livereload)
+    log(f"Serving {site.dir_path_public} at http://localhost:{port}, watching for changes…")
+
+    watcher = make_watcher(rebuilder.watched_paths(), interval, poll)
+    try:
+        while True:
+            changed = watcher.changes()
+            start = time.perf_counter()
+            rebuilder.rebuild(changed)
+            livereload.notify()
+            elapsed = (time.perf_counter() - start) * 1000
+            log(f"Rebuilt {len(changed)} change(s) in {elapsed:.0f} ms")
+            watcher.set_paths(rebuilder.watched_paths())
+    except KeyboardInterrupt:
+        watcher.stop()
+        server.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild on change and serve the site.")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--interval", type=float, default=0.05,
+                        help="seconds between polls for changes, or to wait for "
+                             "more events after a change when watching natively")
+    parser.add_argument("--poll", action="store_true",
+                        help="poll for changes even when watchdog is installed")
+    args, build_args = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+    options = site.parse_args(build_args + ["--incremental"])
+    set_verbosity(options.verbosity)
+    configure_inline_cache(options.inline_cache)
+    watch(options, args.port, args.interval, args.poll)
+
+
+if __name__ == "__main__":
+    main()